@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+365Scores API Client
+Shared HTTP client for every script that talks to webws.365scores.com
+Keeps connections alive in a pool, decodes compressed bodies itself,
+retries with jittered backoff and counts what the network phase costs
+Responses go through the on-disk cache in response_cache.py
+"""
+
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from response_cache import ResponseCache, cache_enabled
+from json_stream import iter_arrays
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 365Scores API Configuration
+API_BASE_URL = os.getenv("API_BASE_URL", "https://webws.365scores.com").rstrip("/")
+LANG_ID = 9
+TZ_NAME = "UTC"
+USER_COUNTRY_ID = 331
+APP_ID = 5
+
+# Connection pool and retry tuning
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Reading response.raw bypasses requests' error wrapping: a truncated or stalled
+# body raises urllib3 errors, and a corrupt compressed body zlib/gzip ones
+# (gzip.BadGzipFile is an OSError, a gzip stream cut short an EOFError)
+BODY_ERRORS = (urllib3.exceptions.HTTPError, zlib.error, OSError, EOFError)
+STREAM_CHUNK = 64 * 1024
+
+def _supported_encodings():
+    """Only advertise encodings this module can actually decode"""
+    encodings = ["gzip", "deflate"]
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return ", ".join(encodings)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Mobile Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': _supported_encodings(),
+    'Cache-Control': 'no-cache',
+    'Pragma': 'no-cache',
+    'Origin': 'https://www.365scores.com',
+    'Referer': 'https://www.365scores.com/',
+    'Sec-Ch-Ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
+    'Sec-Ch-Ua-Mobile': '?1',
+    'Sec-Ch-Ua-Platform': '"Android"',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-site'
+}
+
+def _base_params():
+    return f"appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}"
+
+def competitions_url():
+    """URL of the full competitions + countries catalogue"""
+    return f"{API_BASE_URL}/web/competitions/?{_base_params()}"
+
+def standings_url(comp_id):
+    """URL of the current standings for one competition"""
+    return f"{API_BASE_URL}/web/standings/?competitions={comp_id}&live=false&{_base_params()}"
+
+def decode_body(raw, content_encoding):
+    """Undo every Content-Encoding applied to a response body"""
+    codings = [c.strip().lower() for c in (content_encoding or "").split(",") if c.strip()]
+    for coding in reversed(codings):
+        if coding in ("gzip", "x-gzip"):
+            raw = gzip.decompress(raw)
+        elif coding == "deflate":
+            try:
+                raw = zlib.decompress(raw)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                raw = zlib.decompress(raw, -zlib.MAX_WBITS)
+        elif coding == "br":
+            if brotli is None:
+                raise ValueError("brotli-encoded response but brotli is not installed")
+            raw = brotli.decompress(raw)
+        elif coding == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd-encoded response but zstandard is not installed")
+            raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+        elif coding != "identity":
+            raise ValueError(f"Unsupported content encoding: {coding}")
+    return raw
+
+class ApiError(Exception):
+    """Raised when the API answers with anything other than a 200, or with an unreadable body"""
+
+def endpoint_of(url):
+    """Path part of a URL, used to group stats per endpoint"""
+    return urlsplit(url).path
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p * (len(sorted_values) - 1))))]
+
+class RequestStats:
+    """Thread-safe counters for requests, bytes and latency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_revalidated = 0
+        self.bytes_wire = 0
+        self.bytes_decoded = 0
+        self.latencies = []
+        self.parsed = 0
+        self.parse_seconds = 0.0
+        # endpoint path -> [latencies, bytes_wire]
+        self.by_endpoint = {}
+
+    def record(self, latency, bytes_wire=0, bytes_decoded=0, failed=False, endpoint=None):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.bytes_wire += bytes_wire
+            self.bytes_decoded += bytes_decoded
+            if failed:
+                self.failures += 1
+            if endpoint:
+                entry = self.by_endpoint.setdefault(endpoint, [[], 0])
+                entry[0].append(latency)
+                entry[1] += bytes_wire
+
+    def record_parse(self, seconds):
+        with self._lock:
+            self.parsed += 1
+            self.parse_seconds += seconds
+
+    def __getstate__(self):
+        # Sent back from worker processes; the lock cannot be pickled
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def merge(self, other):
+        """Add another client's counters (e.g. from a worker process) to these"""
+        with self._lock:
+            for name in ('requests', 'failures', 'retries', 'cache_hits', 'cache_revalidated',
+                         'bytes_wire', 'bytes_decoded', 'parsed', 'parse_seconds'):
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+            self.latencies.extend(other.latencies)
+            for endpoint, (latencies, bytes_wire) in other.by_endpoint.items():
+                entry = self.by_endpoint.setdefault(endpoint, [[], 0])
+                entry[0].extend(latencies)
+                entry[1] += bytes_wire
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_cache(self, revalidated=False):
+        with self._lock:
+            if revalidated:
+                self.cache_revalidated += 1
+            else:
+                self.cache_hits += 1
+
+    def summary(self):
+        """Return a plain dict snapshot of the counters"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        pct = lambda p: percentile(latencies, p)
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'cache_revalidated': self.cache_revalidated,
+            'bytes_wire': self.bytes_wire,
+            'bytes_decoded': self.bytes_decoded,
+            'latency_total_s': round(sum(latencies), 3),
+            'latency_p50_s': round(pct(0.50), 3),
+            'latency_p95_s': round(pct(0.95), 3),
+            'latency_max_s': round(latencies[-1], 3) if latencies else 0.0,
+            'parsed': self.parsed,
+            'parse_seconds': round(self.parse_seconds, 3),
+        }
+
+    def endpoints(self):
+        """Per-endpoint request count, bytes and latency percentiles"""
+        with self._lock:
+            entries = {endpoint: (sorted(latencies), bytes_wire)
+                       for endpoint, (latencies, bytes_wire) in self.by_endpoint.items()}
+        return {
+            endpoint: {
+                'requests': len(latencies),
+                'bytes_wire': bytes_wire,
+                'p50_s': round(percentile(latencies, 0.50), 3),
+                'p95_s': round(percentile(latencies, 0.95), 3),
+                'max_s': round(latencies[-1], 3) if latencies else 0.0,
+            }
+            for endpoint, (latencies, bytes_wire) in sorted(entries.items())
+        }
+
+    def report(self):
+        """Print a short summary of the network phase"""
+        s = self.summary()
+        ratio = s['bytes_decoded'] / s['bytes_wire'] if s['bytes_wire'] else 0
+        print(f"\n🌐 NETWORK SUMMARY")
+        print(f"   Requests: {s['requests']} ({s['failures']} failed, {s['retries']} retries)")
+        print(f"   Cache: {s['cache_hits']} served locally, {s['cache_revalidated']} revalidated (304)")
+        print(f"   Transferred: {s['bytes_wire'] / 1024:,.1f} KB ({s['bytes_decoded'] / 1024:,.1f} KB decoded, {ratio:.1f}x)")
+        print(f"   Latency: p50 {s['latency_p50_s']:.3f}s, p95 {s['latency_p95_s']:.3f}s, max {s['latency_max_s']:.3f}s")
+
+class ApiClient:
+    """Pooled keep-alive client for the 365Scores web API"""
+
+    def __init__(self, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS, cache=None):
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max(1, max_attempts)
+        self.stats = RequestStats()
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when sent"""
+        if retry_after:
+            try:
+                return min(BACKOFF_CAP, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+    def get(self, url, headers=None):
+        """GET a URL, returning (status_code, decoded_body, response_headers).
+
+        Connection errors, timeouts, truncated or undecodable bodies and
+        retryable statuses are retried up to max_attempts times; the last
+        failure is raised (a body error as ApiError) or returned.
+        """
+        endpoint = endpoint_of(url)
+        for attempt in range(self.max_attempts):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+                try:
+                    raw = response.raw.read(decode_content=False)
+                finally:
+                    # Hand the socket back to the pool instead of closing it
+                    response.raw.release_conn()
+                body = decode_body(raw, response.headers.get('Content-Encoding'))
+            except (requests.exceptions.RequestException,) + BODY_ERRORS as e:
+                self.stats.record(time.perf_counter() - started, failed=True, endpoint=endpoint)
+                if attempt + 1 >= self.max_attempts:
+                    if isinstance(e, requests.exceptions.RequestException):
+                        raise
+                    raise ApiError(f"Bad response body: {e!r}") from e
+                self.stats.record_retry()
+                time.sleep(self._backoff(attempt))
+                continue
+
+            failed = response.status_code >= 400
+            self.stats.record(time.perf_counter() - started, len(raw), len(body), failed=failed, endpoint=endpoint)
+            if response.status_code in RETRY_STATUSES and attempt + 1 < self.max_attempts:
+                self.stats.record_retry()
+                time.sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+                continue
+            return response.status_code, body, response.headers
+
+    def fetch(self, url):
+        """GET a URL through the response cache, returning (status_code, body)"""
+        entry = self.cache.get(url) if self.cache else None
+        if entry and entry.is_fresh():
+            self.stats.record_cache()
+            return 200, entry.body
+
+        status, body, headers = self.get(url, headers=entry.validators() if entry else None)
+        if status == 304 and entry:
+            self.cache.touch(url)
+            self.stats.record_cache(revalidated=True)
+            return 200, entry.body
+        if status == 200 and self.cache:
+            self.cache.put(url, body, headers.get('ETag'), headers.get('Last-Modified'))
+        return status, body
+
+    def fetch_json(self, url):
+        """GET a URL and parse the JSON body, raising ApiError on a non-200"""
+        status, body = self.fetch(url)
+        if status != 200:
+            raise ApiError(f"HTTP {status}")
+        started = time.perf_counter()
+        data = json.loads(body)
+        self.stats.record_parse(time.perf_counter() - started)
+        return data
+
+    def stream_json_arrays(self, url, keys):
+        """Yield (key, item) for the named top-level arrays of a JSON response as it downloads.
+
+        Meant for large catalogue payloads: items reach the caller while the
+        body is still arriving and the whole document is never held in memory.
+        Bypasses the response cache. Only opening the request is retried; a
+        non-200, or a connection that drops or stalls mid-stream, raises ApiError.
+        """
+        endpoint = endpoint_of(url)
+        # urllib3 decompresses the stream itself, so only offer what it can decode
+        headers = {'Accept-Encoding': ', '.join(HTTPResponse.CONTENT_DECODERS)}
+        for attempt in range(self.max_attempts):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            except requests.exceptions.RequestException:
+                self.stats.record(time.perf_counter() - started, failed=True, endpoint=endpoint)
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                self.stats.record_retry()
+                time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code == 200:
+                break
+            response.close()
+            self.stats.record(time.perf_counter() - started, failed=True, endpoint=endpoint)
+            if response.status_code in RETRY_STATUSES and attempt + 1 < self.max_attempts:
+                self.stats.record_retry()
+                time.sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+                continue
+            raise ApiError(f"HTTP {response.status_code}")
+
+        # Time spent reading the socket counts as latency, the rest of the
+        # iteration as parsing; time the caller spends on each item counts as neither
+        network_seconds = time.perf_counter() - started
+        parse_seconds = 0.0
+        decoded = 0
+
+        def chunks():
+            nonlocal network_seconds, decoded
+            stream = response.raw.stream(STREAM_CHUNK, decode_content=True)
+            while True:
+                read_started = time.perf_counter()
+                try:
+                    chunk = next(stream, None)
+                except BODY_ERRORS as e:
+                    raise ApiError(f"Stream interrupted: {e!r}") from e
+                network_seconds += time.perf_counter() - read_started
+                if chunk is None:
+                    return
+                decoded += len(chunk)
+                yield chunk
+
+        items = iter_arrays(chunks(), keys)
+        failed = True
+        try:
+            while True:
+                step_started = time.perf_counter()
+                network_before = network_seconds
+                item = next(items, None)
+                parse_seconds += (time.perf_counter() - step_started) - (network_seconds - network_before)
+                if item is None:
+                    break
+                yield item
+            failed = False
+        finally:
+            response.close()
+            self.stats.record(network_seconds, response.raw.tell(), decoded, failed=failed, endpoint=endpoint)
+            self.stats.record_parse(parse_seconds)
+
+    def get_json(self, url):
+        """GET a URL and parse the JSON body, or return None on a non-200"""
+        try:
+            return self.fetch_json(url)
+        except ApiError as e:
+            print(f"    ❌ {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide shared client, creating it on first use"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ApiClient(cache=ResponseCache() if cache_enabled() else None)
+        return _default_client
+
+def make_api_request(url, description=""):
+    """Make API request with error handling"""
+    try:
+        print(f"  🌐 {description}...")
+        return get_client().get_json(url)
+    except requests.exceptions.RequestException as e:
+        print(f"    ❌ Request failed: {e}")
+        return None
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"    ❌ Invalid response: {e}")
+        return None
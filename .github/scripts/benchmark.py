@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark
+Runs the full population and the daily update against the local replay
+server in a scratch workspace and records wall time, requests/sec,
+rows/sec and peak RSS per scenario. Results are saved as JSON and can be
+compared with an earlier result to spot regressions between commits
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from replay_server import ReplayServer, synthesize
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MASTER_PATH = os.path.join(SCRIPTS_DIR, "..", "..", "master", "teams_master.json")
+
+# (name, command); each runs in the same workspace, in order
+SCENARIOS = [
+    ("create_schema", ["create_schema.py"]),
+    ("full_population", ["full_database_population.py", "--fresh"]),
+    ("daily_update", ["update_current_season.py"]),
+    ("daily_update_repeat", ["update_current_season.py"]),
+]
+
+ROWS_WRITTEN = re.compile(r"Rows written: ([\d,]+)")
+
+# Runs a script as __main__ and writes its peak RSS (KB) on exit. ru_maxrss is
+# not used because Linux carries the forking parent's peak across exec.
+BOOTSTRAP = """
+import atexit, os, resource, runpy, sys
+def _peak_rss():
+    try:
+        with open('/proc/self/status') as f:
+            kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == 'darwin' else 1)
+    with open(os.environ['BENCH_RSS_FILE'], 'w') as f:
+        f.write(str(kb))
+atexit.register(_peak_rss)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenario(name, command, env, server, log_dir):
+    """Run one script as a child process and measure it"""
+    requests_before = server.stats.requests
+    log_path = os.path.join(log_dir, f"{name}.log")
+    rss_path = os.path.join(log_dir, f"{name}.rss")
+    env = dict(env, BENCH_RSS_FILE=rss_path)
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen([sys.executable, "-c", BOOTSTRAP] + command, cwd=SCRIPTS_DIR, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own CPU time
+        _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    exit_code = os.waitstatus_to_exitcode(status)
+
+    with open(log_path, encoding="utf-8") as f:
+        rows = sum(int(match.replace(",", "")) for match in ROWS_WRITTEN.findall(f.read()))
+    requests = server.stats.requests - requests_before
+    try:
+        with open(rss_path) as f:
+            rss_mb = int(f.read()) / 1024
+    except (OSError, ValueError):
+        rss_mb = 0.0
+    return {
+        "exit_code": exit_code,
+        "wall_seconds": round(wall, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall, 2) if wall else 0,
+        "rows_written": rows,
+        "rows_per_sec": round(rows / wall, 1) if wall else 0,
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+def run_benchmark(recordings, latency, jitter, error_rate, max_rps, concurrency, seed=1):
+    server = ReplayServer(recordings, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed).start()
+    workspace = tempfile.mkdtemp(prefix="dailybread-bench-")
+    os.makedirs(os.path.join(workspace, "new_project", "db"))
+    env = dict(os.environ,
+               GITHUB_WORKSPACE=workspace,
+               API_BASE_URL=server.base_url,
+               HTTP_CACHE="0",
+               MAX_REQUESTS_PER_SECOND=str(max_rps),
+               FETCH_CONCURRENCY=str(concurrency),
+               PYTHONUNBUFFERED="1")
+
+    print(f"🏁 Benchmarking against {server.base_url} (latency {latency}s ±{jitter}s, errors {error_rate:.0%}, "
+          f"max {max_rps or 'unlimited'} req/s, {concurrency} workers)")
+    print(f"   Workspace: {workspace}")
+    scenarios = {}
+    for name, command in SCENARIOS:
+        result = run_scenario(name, command, env, server, workspace)
+        scenarios[name] = result
+        print(f"  {'✅' if result['exit_code'] == 0 else '❌'} {name:20} {result['wall_seconds']:8.2f}s "
+              f"{result['requests']:6} req ({result['requests_per_sec']:.1f}/s) "
+              f"{result['rows_written']:8,} rows ({result['rows_per_sec']:,.0f}/s) "
+              f"peak {result['peak_rss_mb']:.0f} MB")
+    server.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "server": {"latency": latency, "jitter": jitter, "error_rate": error_rate,
+                   "max_rps": max_rps, "concurrency": concurrency, **server.stats.summary()},
+        "workspace": workspace,
+        "scenarios": scenarios,
+    }
+
+def compare(result, baseline_path):
+    """Print per-scenario changes against an earlier result file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {baseline.get('commit')} ({baseline.get('timestamp')})")
+    for name, current in result["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for metric in ("wall_seconds", "requests_per_sec", "rows_per_sec", "peak_rss_mb"):
+            if before.get(metric):
+                delta = (current[metric] - before[metric]) / before[metric] * 100
+                changes.append(f"{metric} {before[metric]} -> {current[metric]} ({delta:+.1f}%)")
+        print(f"  {name}: " + ", ".join(changes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against the local replay server")
+    parser.add_argument("--recordings", help="recordings directory (default: synthesized from teams_master.json)")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0, help="client rate cap; 0 disables it")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    recordings = args.recordings
+    if not recordings:
+        recordings = tempfile.mkdtemp(prefix="dailybread-recordings-")
+        synthesize(MASTER_PATH, recordings)
+
+    result = run_benchmark(recordings, args.latency, args.jitter, args.error_rate, args.max_rps, args.concurrency)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {args.out}")
+    if args.compare:
+        compare(result, args.compare)
+    if any(s["exit_code"] != 0 for s in result["scenarios"].values()):
+        sys.exit(1)
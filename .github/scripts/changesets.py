@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Database Changesets
+Publishes the rows changed since the last release as a compact changeset
+(changeset-<from>-<to>.json.gz) and applies changesets to a consumer's copy
+of soccer_data_colab.db. Changed row ids come from the change_log triggers;
+a content checksum over the replicated tables confirms the result, and the
+sync command falls back to downloading the full database when it does not
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+from datetime import datetime
+
+from create_schema import resolve_db_path, create_change_tracking, REPLICATED_TABLES
+
+CHANGESET_FORMAT = "soccer-db-changeset"
+CHANGESET_NAME = re.compile(r"^changeset-(\d+)-(\d+)\.json\.gz$")
+DB_ASSET = "soccer_data_colab.db"
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+CHUNK = 500
+CHANGED_ROWS_SQL = "SELECT DISTINCT row_id FROM change_log WHERE table_name = ? ORDER BY row_id"
+
+def table_columns(conn, table):
+    """Column names in a fixed order, independent of how the table was migrated"""
+    return sorted(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+
+def content_checksum(conn):
+    """sha256 over every replicated row, in id order"""
+    digest = hashlib.sha256()
+    for table in REPLICATED_TABLES:
+        columns = table_columns(conn, table)
+        digest.update(f"{table}:{','.join(columns)}\n".encode("utf-8"))
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id"):
+            digest.update(json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            digest.update(b"\n")
+    return digest.hexdigest()
+
+def read_sync_state(conn):
+    return conn.execute("SELECT version, checksum FROM sync_state WHERE id = 1").fetchone()
+
+def changeset_name(from_version, to_version):
+    return f"changeset-{from_version}-{to_version}.json.gz"
+
+def collect_changes(conn):
+    """Current values of every logged row, or a delete marker if it is gone"""
+    tables = {}
+    for table in REPLICATED_TABLES:
+        ids = [row[0] for row in conn.execute(CHANGED_ROWS_SQL, (table,))]
+        if not ids:
+            continue
+        columns = table_columns(conn, table)
+        upsert = []
+        for start in range(0, len(ids), CHUNK):
+            chunk = ids[start:start + CHUNK]
+            upsert.extend(conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE id IN ({', '.join('?' for _ in chunk)}) ORDER BY id",
+                chunk
+            ).fetchall())
+        id_position = columns.index("id")
+        present = {row[id_position] for row in upsert}
+        tables[table] = {
+            "columns": columns,
+            "upsert": [list(row) for row in upsert],
+            "delete": [row_id for row_id in ids if row_id not in present],
+        }
+    return tables
+
+def build_changeset(db_path=None, out_dir="."):
+    """Write the changeset since the last published version and bump the version.
+
+    Returns the changeset path, or None when nothing changed.
+    """
+    conn = sqlite3.connect(db_path or resolve_db_path())
+    create_change_tracking(conn.cursor())
+    version, base_checksum = read_sync_state(conn)
+
+    tables = collect_changes(conn)
+    if not tables:
+        print(f"📭 No row changes since version {version}, no changeset written")
+        conn.commit()
+        conn.close()
+        return None
+
+    checksum = content_checksum(conn)
+    doc = {
+        "format": CHANGESET_FORMAT,
+        "from_version": version,
+        "to_version": version + 1,
+        "base_checksum": base_checksum,
+        "checksum": checksum,
+        "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        "tables": tables,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, changeset_name(version, version + 1))
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=9) as f:
+        json.dump(doc, f, separators=(",", ":"), ensure_ascii=False)
+
+    conn.execute("UPDATE sync_state SET version = ?, checksum = ?, published_at = ? WHERE id = 1",
+                 (version + 1, checksum, doc["created_at"]))
+    conn.execute("DELETE FROM change_log")
+    conn.commit()
+    conn.close()
+
+    upserts = sum(len(t["upsert"]) for t in tables.values())
+    deletes = sum(len(t["delete"]) for t in tables.values())
+    print(f"📦 {os.path.basename(path)}: {upserts:,} upserts, {deletes:,} deletes, {os.path.getsize(path):,} bytes")
+    for table, changes in tables.items():
+        print(f"   {table}: {len(changes['upsert']):,} upserts, {len(changes['delete']):,} deletes")
+    return path
+
+def load_changeset(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("format") != CHANGESET_FORMAT:
+        raise ValueError(f"{path} is not a changeset")
+    return doc
+
+def apply_changeset(conn, doc):
+    """Apply one changeset inside the caller's transaction"""
+    version, checksum = read_sync_state(conn)
+    if version != doc["from_version"]:
+        raise ValueError(f"changeset starts at version {doc['from_version']}, database is at {version}")
+    # Version 0 was never published, so it has no checksum to check against;
+    # apply_changesets still verifies the checksum the changeset ends at
+    if doc["from_version"] != 0:
+        if doc["base_checksum"] is None or checksum != doc["base_checksum"]:
+            raise ValueError("database does not match the changeset's base")
+
+    tables = doc["tables"]
+    for table in reversed(REPLICATED_TABLES):
+        deleted = tables.get(table, {}).get("delete", [])
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in deleted])
+    for table in REPLICATED_TABLES:
+        if table not in tables:
+            continue
+        columns = tables[table]["columns"]
+        rows = tables[table]["upsert"]
+        id_position = columns.index("id")
+        # Delete + insert rather than REPLACE so delete/insert triggers (search index) fire normally
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row[id_position],) for row in rows])
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", rows
+        )
+    conn.execute("UPDATE sync_state SET version = ?, checksum = ?, published_at = ? WHERE id = 1",
+                 (doc["to_version"], doc["checksum"], doc["created_at"]))
+
+def apply_changesets(db_path, paths):
+    """Apply changesets in order and verify the final checksum; rolls back on any mismatch"""
+    docs = sorted((load_changeset(p) for p in paths), key=lambda d: d["from_version"])
+    conn = sqlite3.connect(db_path)
+    try:
+        create_change_tracking(conn.cursor())
+        for doc in docs:
+            apply_changeset(conn, doc)
+            print(f"  ✅ Applied version {doc['from_version']} -> {doc['to_version']}")
+        if docs and content_checksum(conn) != docs[-1]["checksum"]:
+            raise ValueError("checksum mismatch after applying changesets")
+        # Consumers never publish, so their own change log is not kept
+        conn.execute("DELETE FROM change_log")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return docs[-1]["to_version"] if docs else None
+
+def _download(session, url, path):
+    with session.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path + ".part", "wb") as f:
+            shutil.copyfileobj(response.raw, f)
+    os.replace(path + ".part", path)
+
+def published_checksum(session, url, work_dir):
+    """Checksum a changeset ends at, i.e. the published checksum of its to_version"""
+    path = os.path.join(work_dir, url.rsplit("/", 1)[-1])
+    _download(session, url, path)
+    return load_changeset(path)["checksum"]
+
+def sync_from_releases(repo, db_path=None, work_dir=None):
+    """Bring db_path up to the latest release, by changesets when possible"""
+    import requests
+
+    db_path = db_path or resolve_db_path()
+    work_dir = work_dir or os.path.join(os.path.dirname(db_path), "changesets")
+    os.makedirs(work_dir, exist_ok=True)
+    session = requests.Session()
+    session.headers["Accept"] = "application/vnd.github+json"
+
+    response = session.get(f"{GITHUB_API_URL}/repos/{repo}/releases", params={"per_page": 100}, timeout=30)
+    response.raise_for_status()
+    releases = response.json()
+    if not releases:
+        print("📭 No releases published")
+        return
+
+    changesets = {}
+    for release in releases:
+        for asset in release.get("assets", []):
+            match = CHANGESET_NAME.match(asset["name"])
+            if match:
+                changesets[int(match.group(1))] = (int(match.group(2)), asset["browser_download_url"])
+    latest_version = max((to for to, _ in changesets.values()), default=None)
+
+    local_version = local_checksum = None
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            local_version = read_sync_state(conn)[0]
+            if local_version is not None and local_version == latest_version:
+                local_checksum = content_checksum(conn)
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    chain = []
+    version = local_version
+    while version is not None and version in changesets:
+        to_version, url = changesets[version]
+        chain.append(url)
+        version = to_version
+
+    if local_version is not None and local_version == latest_version:
+        # Same version is not enough: a diverged copy gets the full database
+        final_url = next(url for to, url in changesets.values() if to == latest_version)
+        if local_checksum == published_checksum(session, final_url, work_dir):
+            print(f"✅ Already at version {local_version}")
+            return
+        print(f"⚠️ Local database does not match version {local_version}, downloading the full database")
+    elif chain and version == latest_version:
+        print(f"🔄 Updating version {local_version} -> {latest_version} with {len(chain)} changesets")
+        try:
+            paths = []
+            for url in chain:
+                path = os.path.join(work_dir, url.rsplit("/", 1)[-1])
+                _download(session, url, path)
+                paths.append(path)
+            apply_changesets(db_path, paths)
+            return
+        except Exception as e:
+            print(f"⚠️ Changeset update failed ({e}), falling back to a full download")
+    else:
+        print(f"🔄 No changeset chain from version {local_version}, downloading the full database")
+
+    latest = releases[0]
+    for asset in latest.get("assets", []):
+        if asset["name"] == DB_ASSET:
+            _download(session, asset["browser_download_url"], db_path)
+            print(f"✅ Downloaded {DB_ASSET} from {latest.get('tag_name')}")
+            return
+    raise RuntimeError(f"Latest release has no {DB_ASSET} asset")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and apply soccer_data_colab.db changesets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="write the changeset since the last published version")
+    build.add_argument("--out", default=".", help="directory for the changeset file")
+    apply = commands.add_parser("apply", help="apply changeset files to a local database")
+    apply.add_argument("paths", nargs="+")
+    apply.add_argument("--db", help="database path (defaults to the repo database)")
+    sync = commands.add_parser("sync", help="update a local database from GitHub releases")
+    sync.add_argument("--repo", required=True, help="owner/name of the publishing repository")
+    sync.add_argument("--db", help="database path (defaults to the repo database)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_changeset(out_dir=args.out)
+    elif args.command == "apply":
+        try:
+            apply_changesets(args.db or resolve_db_path(), args.paths)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    else:
+        sync_from_releases(args.repo, args.db)
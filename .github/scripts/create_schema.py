@@ -7,6 +7,9 @@ Creates the database schema from scratch if no database exists
 import sqlite3
 import os
 
+from migrations import migrate
+from profiling import profile_run
+
 def resolve_db_path():
     """Resolve absolute DB path using GITHUB_WORKSPACE if available."""
     workspace = os.getenv("GITHUB_WORKSPACE")
@@ -15,8 +18,293 @@ def resolve_db_path():
     # Fallback to previous relative logic (executed from .github/scripts)
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "new_project", "db", "soccer_data_colab.db"))
 
-def create_database_schema():
-    """Create the complete database schema"""
+def create_update_tables(cursor):
+    """Create (or upgrade) the bookkeeping tables used by the update scripts"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS update_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        update_type TEXT,
+        competitions_processed INTEGER,
+        teams_updated INTEGER,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        competitions_skipped INTEGER DEFAULT 0
+    )
+    ''')
+    
+    # Databases created before competitions_skipped existed
+    cursor.execute('PRAGMA table_info(update_log)')
+    if 'competitions_skipped' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE update_log ADD COLUMN competitions_skipped INTEGER DEFAULT 0')
+    
+    # Hash of the last roster written per competition, used to skip unchanged ones
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS competition_fingerprints (
+        competition_id INTEGER PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        team_count INTEGER,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (competition_id) REFERENCES competitions (id)
+    )
+    ''')
+    
+    # Adaptive refresh state for the daily update (see refresh_scheduler.py)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS refresh_schedule (
+        competition_id INTEGER PRIMARY KEY,
+        last_fetched_at DATETIME,
+        last_changed_at DATETIME,
+        fetch_count INTEGER NOT NULL DEFAULT 0,
+        change_count INTEGER NOT NULL DEFAULT 0,
+        change_rate REAL NOT NULL DEFAULT 0.5,
+        in_season BOOLEAN DEFAULT TRUE,
+        next_due_at DATETIME,
+        FOREIGN KEY (competition_id) REFERENCES competitions (id)
+    )
+    ''')
+    
+    # Per-competition checkpoint for resumable full population runs
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS population_progress (
+        competition_id INTEGER PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (competition_id) REFERENCES competitions (id)
+    )
+    ''')
+    
+    # Phase timings and per-endpoint latency of each run (see run_metrics.py)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS run_metrics (
+        id INTEGER PRIMARY KEY,
+        update_log_id INTEGER NOT NULL UNIQUE,
+        wall_seconds REAL,
+        requests INTEGER,
+        bytes_wire INTEGER,
+        rows_written INTEGER,
+        phases TEXT NOT NULL,
+        endpoints TEXT NOT NULL,
+        FOREIGN KEY (update_log_id) REFERENCES update_log (id)
+    )
+    ''')
+
+def create_export_tracking(cursor):
+    """Triggers that queue teams whose teams_master.json entry needs regenerating"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS export_dirty (
+        team_id INTEGER PRIMARY KEY
+    )
+    ''')
+    
+    # sha256 of the teams_master.json this database last exported; export_dirty
+    # is only relative to that file, so without it the next export is full
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS export_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        sha256 TEXT NOT NULL,
+        exported_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # INSERT OR IGNORE inside a trigger still fails when the outer statement is
+    # an upsert, so duplicates are filtered explicitly
+    def mark(team_ids):
+        return f'INSERT INTO export_dirty SELECT DISTINCT id FROM ({team_ids}) WHERE id NOT IN (SELECT team_id FROM export_dirty);'
+    
+    triggers = {
+        'teams_export_insert': f"AFTER INSERT ON teams BEGIN {mark('SELECT NEW.id AS id')} END",
+        'teams_export_update': f"AFTER UPDATE ON teams BEGIN {mark('SELECT NEW.id AS id')} END",
+        'teams_export_delete': f"AFTER DELETE ON teams BEGIN {mark('SELECT OLD.id AS id')} END",
+        'team_competitions_export_insert': f"AFTER INSERT ON team_competitions BEGIN {mark('SELECT NEW.team_id AS id')} END",
+        'team_competitions_export_update': f"AFTER UPDATE ON team_competitions BEGIN {mark('SELECT NEW.team_id AS id')} END",
+        'team_competitions_export_delete': f"AFTER DELETE ON team_competitions BEGIN {mark('SELECT OLD.team_id AS id')} END",
+        'competitions_export_update': f'''AFTER UPDATE ON competitions BEGIN
+            {mark('SELECT team_id AS id FROM team_competitions WHERE competition_id = NEW.id')}
+        END''',
+        'countries_export_update': f'''AFTER UPDATE ON countries BEGIN
+            {mark('SELECT id FROM teams WHERE country_id = NEW.id')}
+            {mark("""SELECT tc.team_id AS id FROM team_competitions tc
+                JOIN competitions c ON c.id = tc.competition_id
+                WHERE c.country_id = NEW.id""")}
+        END''',
+    }
+    for name, body in triggers.items():
+        # Recreated every time so databases with older trigger bodies are upgraded
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'CREATE TRIGGER {name} {body}')
+
+# Tables shipped to consumers through changesets, parents before children
+REPLICATED_TABLES = ['sports', 'countries', 'competitions', 'seasons', 'teams', 'team_competitions', 'update_log']
+
+def create_change_tracking(cursor):
+    """Triggers that log the id of every row changed in a replicated table"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL
+    )
+    ''')
+    
+    # Single row: the published version this database corresponds to
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        checksum TEXT,
+        published_at DATETIME
+    )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO sync_state (id, version) VALUES (1, 0)')
+    
+    for table in REPLICATED_TABLES:
+        triggers = {
+            f'{table}_changes_insert': f"AFTER INSERT ON {table} BEGIN INSERT INTO change_log (table_name, row_id) VALUES ('{table}', NEW.id); END",
+            f'{table}_changes_update': f'''AFTER UPDATE ON {table} BEGIN
+                INSERT INTO change_log (table_name, row_id) SELECT '{table}', OLD.id UNION SELECT '{table}', NEW.id;
+            END''',
+            f'{table}_changes_delete': f"AFTER DELETE ON {table} BEGIN INSERT INTO change_log (table_name, row_id) VALUES ('{table}', OLD.id); END",
+        }
+        for name, body in triggers.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'CREATE TRIGGER {name} {body}')
+
+# Full recomputation of every aggregate, used to backfill and to check the triggers
+AGGREGATES_SQL = '''
+    SELECT 'teams', 0, COUNT(*) FROM teams
+    UNION ALL SELECT 'teams_without_country', 0, COUNT(*) FROM teams WHERE country_id IS NULL
+    UNION ALL SELECT 'teams_by_country', country_id, COUNT(*) FROM teams WHERE country_id IS NOT NULL GROUP BY country_id
+    UNION ALL SELECT 'competitions', 0, COUNT(*) FROM competitions
+    UNION ALL SELECT 'competitions_with_standings', 0, COUNT(*) FROM competitions WHERE has_standings = 1
+    UNION ALL SELECT 'competitions_with_stats', 0, COUNT(*) FROM competitions WHERE has_stats = 1
+    UNION ALL SELECT 'competitions_with_brackets', 0, COUNT(*) FROM competitions WHERE has_brackets = 1
+    UNION ALL SELECT 'competitions_with_popularity', 0, COUNT(*) FROM competitions WHERE popularity_rank IS NOT NULL
+    UNION ALL SELECT 'team_competitions', 0, COUNT(*) FROM team_competitions
+    UNION ALL SELECT 'active_team_competitions', 0, COUNT(*) FROM team_competitions WHERE is_active = 1
+    UNION ALL SELECT 'links_by_team', team_id, COUNT(*) FROM team_competitions GROUP BY team_id
+    UNION ALL SELECT 'active_links_by_team', team_id, COUNT(*) FROM team_competitions WHERE is_active = 1 GROUP BY team_id
+    UNION ALL SELECT 'active_links_by_competition', competition_id, COUNT(*) FROM team_competitions WHERE is_active = 1 GROUP BY competition_id
+    UNION ALL SELECT 'teams_with_links', 0, COUNT(DISTINCT team_id) FROM team_competitions
+    UNION ALL SELECT 'teams_with_active_links', 0, COUNT(DISTINCT team_id) FROM team_competitions WHERE is_active = 1
+    UNION ALL SELECT 'competitions_with_active_links', 0, COUNT(DISTINCT competition_id) FROM team_competitions WHERE is_active = 1
+'''
+
+def _bump(name, key, delta, condition='1'):
+    return (f"INSERT INTO aggregates (name, key, value) SELECT '{name}', {key}, {delta} WHERE {condition} "
+            f"ON CONFLICT(name, key) DO UPDATE SET value = value + excluded.value;")
+
+def _bump_distinct(per_key, key, total, sign, condition):
+    """Adjust a per-key count and the number of keys whose count is non-zero"""
+    # Runs after the per-key update: a count that just became 1 (or 0) moved the total
+    edge = 1 if sign > 0 else 0
+    return (_bump(per_key, key, sign, condition) + ' ' +
+            _bump(total, 0, sign, f"{condition} AND (SELECT value FROM aggregates WHERE name = '{per_key}' AND key = {key}) = {edge}"))
+
+def _team_country_changes(row, sign):
+    return ' '.join([
+        _bump('teams_without_country', 0, sign, f'{row}.country_id IS NULL'),
+        _bump('teams_by_country', f'{row}.country_id', sign, f'{row}.country_id IS NOT NULL'),
+    ])
+
+def _competition_flag_changes(row, sign):
+    return ' '.join([
+        _bump('competitions_with_standings', 0, sign, f'{row}.has_standings = 1'),
+        _bump('competitions_with_stats', 0, sign, f'{row}.has_stats = 1'),
+        _bump('competitions_with_brackets', 0, sign, f'{row}.has_brackets = 1'),
+        _bump('competitions_with_popularity', 0, sign, f'{row}.popularity_rank IS NOT NULL'),
+    ])
+
+def _link_changes(row, sign):
+    active = f'{row}.is_active = 1'
+    return ' '.join([
+        _bump('team_competitions', 0, sign),
+        _bump('active_team_competitions', 0, sign, active),
+        _bump_distinct('links_by_team', f'{row}.team_id', 'teams_with_links', sign, '1'),
+        _bump_distinct('active_links_by_team', f'{row}.team_id', 'teams_with_active_links', sign, active),
+        _bump_distinct('active_links_by_competition', f'{row}.competition_id', 'competitions_with_active_links', sign, active),
+    ])
+
+def create_aggregate_tables(cursor):
+    """Report counters (teams per country, active links, feature flags) kept current by triggers"""
+    existing = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'aggregates'").fetchone()
+    # key is 0 for scalar counters, otherwise the country/team/competition id
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS aggregates (
+        name TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        PRIMARY KEY (name, key)
+    ) WITHOUT ROWID
+    ''')
+    
+    triggers = {
+        'teams_aggregates_insert': f"AFTER INSERT ON teams BEGIN {_bump('teams', 0, 1)} {_team_country_changes('NEW', 1)} END",
+        'teams_aggregates_delete': f"AFTER DELETE ON teams BEGIN {_bump('teams', 0, -1)} {_team_country_changes('OLD', -1)} END",
+        'teams_aggregates_update': f"AFTER UPDATE OF country_id ON teams BEGIN {_team_country_changes('OLD', -1)} {_team_country_changes('NEW', 1)} END",
+        'competitions_aggregates_insert': f"AFTER INSERT ON competitions BEGIN {_bump('competitions', 0, 1)} {_competition_flag_changes('NEW', 1)} END",
+        'competitions_aggregates_delete': f"AFTER DELETE ON competitions BEGIN {_bump('competitions', 0, -1)} {_competition_flag_changes('OLD', -1)} END",
+        'competitions_aggregates_update': f'''AFTER UPDATE OF has_standings, has_stats, has_brackets, popularity_rank ON competitions BEGIN
+            {_competition_flag_changes('OLD', -1)} {_competition_flag_changes('NEW', 1)}
+        END''',
+        'team_competitions_aggregates_insert': f"AFTER INSERT ON team_competitions BEGIN {_link_changes('NEW', 1)} END",
+        'team_competitions_aggregates_delete': f"AFTER DELETE ON team_competitions BEGIN {_link_changes('OLD', -1)} END",
+        'team_competitions_aggregates_update': f'''AFTER UPDATE OF team_id, competition_id, is_active ON team_competitions BEGIN
+            {_link_changes('OLD', -1)} {_link_changes('NEW', 1)}
+        END''',
+    }
+    for name, body in triggers.items():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'CREATE TRIGGER {name} {body}')
+    
+    if not existing:
+        rebuild_aggregates(cursor)
+
+def rebuild_aggregates(cursor):
+    """Recompute every aggregate from the base tables"""
+    cursor.execute('DELETE FROM aggregates')
+    cursor.execute(f'INSERT INTO aggregates (name, key, value) {AGGREGATES_SQL}')
+
+def create_search_index(cursor):
+    """FTS5 name indexes on teams and competitions, kept in sync by triggers"""
+    existing = {row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('team_search', 'competition_search')"
+    )}
+    # unicode61 with remove_diacritics folds case and accents: "malmo" finds "Malmö"
+    options = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+    cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS team_search USING fts5(name, {options})')
+    cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS competition_search USING fts5(name, long_name, {options})')
+    
+    # Rows are keyed by rowid = teams.id / competitions.id
+    triggers = {
+        'teams_search_insert': 'AFTER INSERT ON teams BEGIN INSERT INTO team_search (rowid, name) VALUES (NEW.id, NEW.name); END',
+        'teams_search_update': '''AFTER UPDATE OF id, name ON teams BEGIN
+            DELETE FROM team_search WHERE rowid = OLD.id;
+            INSERT INTO team_search (rowid, name) VALUES (NEW.id, NEW.name);
+        END''',
+        'teams_search_delete': 'AFTER DELETE ON teams BEGIN DELETE FROM team_search WHERE rowid = OLD.id; END',
+        'competitions_search_insert': '''AFTER INSERT ON competitions BEGIN
+            INSERT INTO competition_search (rowid, name, long_name) VALUES (NEW.id, NEW.name, NEW.long_name);
+        END''',
+        'competitions_search_update': '''AFTER UPDATE OF id, name, long_name ON competitions BEGIN
+            DELETE FROM competition_search WHERE rowid = OLD.id;
+            INSERT INTO competition_search (rowid, name, long_name) VALUES (NEW.id, NEW.name, NEW.long_name);
+        END''',
+        'competitions_search_delete': 'AFTER DELETE ON competitions BEGIN DELETE FROM competition_search WHERE rowid = OLD.id; END',
+    }
+    for name, body in triggers.items():
+        # Recreated every time so databases with older trigger bodies are upgraded
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'CREATE TRIGGER {name} {body}')
+    
+    # Backfill once when the index is added to an existing database
+    if 'team_search' not in existing:
+        cursor.execute('INSERT INTO team_search (rowid, name) SELECT id, name FROM teams')
+    if 'competition_search' not in existing:
+        cursor.execute('INSERT INTO competition_search (rowid, name, long_name) SELECT id, name, long_name FROM competitions')
+
+def create_database_schema(conn=None):
+    """Create the complete database schema, on conn if given (it is left open)"""
     
     db_path = resolve_db_path()
     
@@ -25,7 +313,9 @@ def create_database_schema():
     
     print("🗄️ Creating database schema...")
     
-    conn = sqlite3.connect(db_path)
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Create sports table
@@ -126,20 +416,22 @@ def create_database_schema():
     )
     ''')
     
-    # Create indexes for better performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_teams_country ON teams(country_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_teams_competition ON teams(main_competition_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_competitions_country ON competitions(country_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_competitions_popularity ON competitions(popularity_rank)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_team_competitions_team ON team_competitions(team_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_team_competitions_comp ON team_competitions(competition_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_seasons_competition ON seasons(competition_id)')
+    create_update_tables(cursor)
+    create_export_tracking(cursor)
+    create_search_index(cursor)
+    create_change_tracking(cursor)
+    create_aggregate_tables(cursor)
+    
+    # Indexes are added by numbered migrations (see migrations.py)
+    migrate(conn)
     
     conn.commit()
-    conn.close()
+    if own:
+        conn.close()
     
     print("✅ Database schema created successfully!")
     return db_path
 
 if __name__ == "__main__":
-    create_database_schema()
+    with profile_run("create_schema"):
+        create_database_schema()
@@ -0,0 +1,6 @@
+"""
+Daily Bread Pipeline
+Single-process entry point for the database pipeline: `python -m dailybread`
+from .github/scripts. The pipeline modules next to this package remain the
+implementation and keep working as standalone scripts
+"""
@@ -0,0 +1,54 @@
+"""
+Pipeline CLI
+  python -m dailybread run --type current_season   schema, update, validate, report
+  python -m dailybread schema|validate|report      one step on its own
+Each command imports only the modules it needs, so validate and report start
+without loading requests or the fetch pipeline
+"""
+
+import argparse
+import os
+import sys
+
+from dailybread.runner import UPDATE_TYPES
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m dailybread", description="365Scores database pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="schema check, update, validate and report in one process")
+    run.add_argument("--type", choices=UPDATE_TYPES, default=os.getenv("UPDATE_TYPE", "current_season"))
+    run.add_argument("--shards", type=int, default=None,
+                     help="full_refresh worker processes (default POPULATION_SHARDS, 0 = one per CPU)")
+    run.add_argument("--fresh", action="store_true", help="full_refresh: ignore any interrupted run")
+    run.add_argument("--report-out", help="write the report to this file instead of stdout")
+
+    commands.add_parser("schema", help="create or upgrade the schema")
+    commands.add_parser("validate", help="validate the database")
+    report = commands.add_parser("report", help="print the update report")
+    report.add_argument("--out", help="write the report to this file instead of stdout")
+    return parser
+
+def main():
+    from profiling import profile_run
+
+    # profile_run strips --profile from argv before argparse sees it
+    with profile_run("dailybread"):
+        args = build_parser().parse_args()
+        if args.command == "run":
+            from dailybread.runner import run
+            return run(args.type, shards=args.shards, report_out=args.report_out,
+                       fresh=args.fresh or os.getenv("FRESH_START", "0") == "1")
+        if args.command == "schema":
+            from create_schema import create_database_schema
+            create_database_schema()
+            return 0
+        if args.command == "validate":
+            import validate_database
+            return 0 if validate_database.main() else 1
+        from dailybread.runner import write_report
+        write_report(out=args.out)
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Pipeline Runner
+Runs schema check, update, validation and report in one process. The steps
+share one SQLite connection and one db_metrics snapshot instead of each
+script reopening the database and repeating the same queries
+"""
+
+import os
+import time
+from contextlib import contextmanager, redirect_stdout
+
+UPDATE_TYPES = ['current_season', 'full_refresh', 'competitions_only']
+
+@contextmanager
+def _step(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, time.perf_counter() - started))
+
+def write_report(conn=None, metrics=None, out=None):
+    """generate_report() to stdout, or to the file at out"""
+    from generate_report import generate_report
+
+    if out is None:
+        generate_report(conn, metrics)
+        return
+    with open(out, 'w', encoding='utf-8') as f, redirect_stdout(f):
+        generate_report(conn, metrics)
+    print(f"📋 Report written to {out}")
+
+def run(update_type='current_season', shards=None, fresh=False, report_out=None):
+    """Schema check, update, validate and report; returns the process exit status"""
+    # Imported here so the lighter subcommands never load the HTTP stack
+    from create_schema import resolve_db_path, create_database_schema
+    from db_metrics import get_metrics
+    from db_writer import connect, finalize
+    import validate_database
+
+    db_path = resolve_db_path()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    timings = []
+    conn = connect(db_path)
+    # A partial population is still validated and reported, then fails the run
+    complete = True
+    try:
+        with _step(timings, 'schema'):
+            create_database_schema(conn)
+
+        if update_type == 'full_refresh':
+            from full_database_population import main as populate, POPULATION_SHARDS
+
+            # The population writes from worker threads and processes on their own
+            # connections, and leaving WAL mode needs every other connection closed
+            finalize(conn)
+            conn = None
+            with _step(timings, 'update'):
+                complete = populate(fresh=fresh, shards=POPULATION_SHARDS if shards is None else shards)
+            conn = connect(db_path)
+        else:
+            from update_current_season import update_current_season
+
+            with _step(timings, 'update'):
+                updated = update_current_season(conn)
+            if not updated:
+                return 1
+
+        with _step(timings, 'validate'):
+            metrics = get_metrics(conn)
+            valid = validate_database.main(conn, metrics)
+        if not valid:
+            return 1
+
+        with _step(timings, 'report'):
+            write_report(conn, metrics, report_out)
+        return 0 if complete else 1
+    finally:
+        if conn is not None:
+            finalize(conn)
+        steps = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in timings)
+        print(f"\n🧭 PIPELINE {update_type}: {steps}")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Aggregate Tables
+Reads the trigger-maintained counters in the aggregates table and checks or
+rebuilds them against the base tables. Checking recomputes everything with
+AGGREGATES_SQL and lists every counter that drifted
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+
+from create_schema import resolve_db_path, create_aggregate_tables, rebuild_aggregates, AGGREGATES_SQL
+
+VALUE_SQL = "SELECT value FROM aggregates WHERE name = ? AND key = ?"
+TOP_KEYS_SQL = "SELECT key, value FROM aggregates WHERE name = ? AND value > 0 ORDER BY value DESC LIMIT ?"
+
+def has_aggregates(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'aggregates'").fetchone() is not None
+
+def aggregate_value(conn, name, key=0):
+    row = conn.execute(VALUE_SQL, (name, key)).fetchone()
+    return row[0] if row else 0
+
+def top_keys(conn, name, limit):
+    """(key, value) pairs with the largest values"""
+    return conn.execute(TOP_KEYS_SQL, (name, limit)).fetchall()
+
+def check_aggregates(conn):
+    """Return (name, key, stored, expected) for every counter that does not match"""
+    expected = {(name, key): value for name, key, value in conn.execute(AGGREGATES_SQL) if value}
+    stored = {(name, key): value for name, key, value in conn.execute("SELECT name, key, value FROM aggregates") if value}
+    return [
+        (name, key, stored.get((name, key), 0), expected.get((name, key), 0))
+        for name, key in sorted(expected.keys() | stored.keys())
+        if stored.get((name, key), 0) != expected.get((name, key), 0)
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild the aggregate tables")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every counter from the base tables")
+    args = parser.parse_args()
+    print(f"🧮 AGGREGATES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+
+    conn = sqlite3.connect(resolve_db_path())
+    create_aggregate_tables(conn.cursor())
+    if args.rebuild:
+        rebuild_aggregates(conn.cursor())
+        conn.commit()
+        print("  ✅ Aggregates rebuilt")
+    else:
+        mismatches = check_aggregates(conn)
+        conn.commit()
+        if mismatches:
+            print(f"  ❌ {len(mismatches)} counters out of sync:")
+            for name, key, stored, expected in mismatches[:20]:
+                print(f"     {name}[{key}]: stored {stored}, expected {expected}")
+            print("  Run with --rebuild to fix")
+            conn.close()
+            sys.exit(1)
+        print("  ✅ All aggregates match the base tables")
+    conn.close()
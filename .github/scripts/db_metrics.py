@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Database Metrics
+Computes every counter and distribution used by validate_database.py and
+generate_report.py, from the trigger-maintained aggregates table when present
+and otherwise with one aggregate scan per large table. The result is stored
+as a versioned snapshot tied to the latest update_log entry; later readers
+reuse the snapshot instead of querying the tables again
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from create_schema import resolve_db_path
+from db_aggregates import aggregate_value, top_keys
+
+# Bump when the snapshot layout changes so older snapshots are recomputed
+METRICS_VERSION = 2
+
+CORE_TABLES = ['countries', 'competitions', 'teams', 'team_competitions', 'sports', 'seasons']
+TOP_N = 10
+RECENT_UPDATES = 5
+
+TOP_COMPETITIONS_SQL = '''
+    SELECT name, popularity_rank, has_standings, has_stats
+    FROM competitions
+    WHERE popularity_rank IS NOT NULL
+    ORDER BY popularity_rank DESC
+    LIMIT ?
+'''
+
+# {skipped} is competitions_skipped, or 0 on databases that predate it
+RECENT_UPDATES_SQL = '''
+    SELECT update_type, competitions_processed, teams_updated, timestamp, {skipped}
+    FROM update_log
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
+def create_metrics_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS metrics_snapshots (
+        id INTEGER PRIMARY KEY,
+        update_log_id INTEGER NOT NULL,
+        metrics_version INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        metrics TEXT NOT NULL,
+        UNIQUE(update_log_id, metrics_version)
+    )
+    ''')
+
+def _existing_tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+def latest_update_id(conn):
+    if 'update_log' not in _existing_tables(conn):
+        return None
+    return conn.execute("SELECT MAX(id) FROM update_log").fetchone()[0]
+
+def _country_names(conn, country_ids):
+    if not country_ids:
+        return {}
+    return dict(conn.execute(
+        f"SELECT id, name FROM countries WHERE id IN ({', '.join('?' for _ in country_ids)})", list(country_ids)
+    ))
+
+def _aggregate_metrics(conn, metrics):
+    """Counters read from the aggregates table, independent of table sizes"""
+    value = lambda name, key=0: aggregate_value(conn, name, key)
+    metrics['tables'].update({
+        'competitions': value('competitions'),
+        'teams': value('teams'),
+        'team_competitions': value('team_competitions'),
+    })
+    metrics['competitions'] = {
+        'with_standings': value('competitions_with_standings'),
+        'with_stats': value('competitions_with_stats'),
+        'with_brackets': value('competitions_with_brackets'),
+        'with_popularity': value('competitions_with_popularity'),
+    }
+    metrics['teams'] = {
+        'without_country': value('teams_without_country'),
+        # Exact as long as every link points at an existing team
+        'without_competitions': value('teams') - value('teams_with_links'),
+    }
+    metrics['team_competitions'] = {
+        'active': value('active_team_competitions'),
+        'active_teams': value('teams_with_active_links'),
+        'active_competitions': value('competitions_with_active_links'),
+    }
+    top = top_keys(conn, 'teams_by_country', TOP_N)
+    names = _country_names(conn, [key for key, _ in top])
+    metrics['top_countries'] = [[names[key], count] for key, count in top if key in names]
+
+def compute_metrics(conn):
+    """Collect all metrics, from aggregates when available, else one scan per large table"""
+    existing = _existing_tables(conn)
+    metrics = {'tables': {}}
+
+    for table in ('countries', 'sports', 'seasons'):
+        if table in existing:
+            metrics['tables'][table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    use_aggregates = 'aggregates' in existing
+    if use_aggregates:
+        _aggregate_metrics(conn, metrics)
+
+    if 'competitions' in existing:
+        metrics['top_competitions'] = [list(row) for row in conn.execute(TOP_COMPETITIONS_SQL, (TOP_N,))]
+
+    if 'competitions' in existing and not use_aggregates:
+        total, standings, stats, brackets, popularity = conn.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(has_standings = 1), 0),
+                   COALESCE(SUM(has_stats = 1), 0),
+                   COALESCE(SUM(has_brackets = 1), 0),
+                   COALESCE(SUM(popularity_rank IS NOT NULL), 0)
+            FROM competitions
+        ''').fetchone()
+        metrics['tables']['competitions'] = total
+        metrics['competitions'] = {
+            'with_standings': standings, 'with_stats': stats,
+            'with_brackets': brackets, 'with_popularity': popularity,
+        }
+
+    if 'teams' in existing and not use_aggregates:
+        # One pass grouped by country gives the totals and the country distribution
+        has_links = 'team_competitions' in existing
+        without_competitions = (
+            "SUM(NOT EXISTS (SELECT 1 FROM team_competitions tc WHERE tc.team_id = t.id))" if has_links else "COUNT(*)"
+        )
+        per_country = conn.execute(f'''
+            SELECT t.country_id, COUNT(*), {without_competitions}
+            FROM teams t
+            GROUP BY t.country_id
+        ''').fetchall()
+        metrics['tables']['teams'] = sum(row[1] for row in per_country)
+        metrics['teams'] = {
+            'without_country': sum(row[1] for row in per_country if row[0] is None),
+            'without_competitions': sum(row[2] for row in per_country),
+        }
+        top = sorted((row for row in per_country if row[0] is not None), key=lambda row: -row[1])[:TOP_N]
+        names = _country_names(conn, [row[0] for row in top]) if 'countries' in existing else {}
+        metrics['top_countries'] = [[names[row[0]], row[1]] for row in top if row[0] in names]
+
+    if 'team_competitions' in existing and not use_aggregates:
+        total, active, active_teams, active_competitions = conn.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(is_active = 1), 0),
+                   COUNT(DISTINCT CASE WHEN is_active = 1 THEN team_id END),
+                   COUNT(DISTINCT CASE WHEN is_active = 1 THEN competition_id END)
+            FROM team_competitions
+        ''').fetchone()
+        metrics['tables']['team_competitions'] = total
+        metrics['team_competitions'] = {
+            'active': active, 'active_teams': active_teams, 'active_competitions': active_competitions,
+        }
+
+    if 'update_log' in existing:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(update_log)")]
+        skipped_col = "competitions_skipped" if "competitions_skipped" in columns else "0"
+        metrics['recent_updates'] = [list(row) for row in conn.execute(
+            RECENT_UPDATES_SQL.format(skipped=skipped_col), (RECENT_UPDATES,)
+        )]
+    return metrics
+
+def get_metrics(conn, refresh=False):
+    """Return the snapshot for the latest update_log entry, computing it if needed.
+
+    Without any update_log entry the metrics are computed but not stored.
+    """
+    update_id = latest_update_id(conn)
+    if update_id is None:
+        return compute_metrics(conn)
+
+    create_metrics_table(conn.cursor())
+    if not refresh:
+        row = conn.execute(
+            "SELECT metrics FROM metrics_snapshots WHERE update_log_id = ? AND metrics_version = ?",
+            (update_id, METRICS_VERSION)
+        ).fetchone()
+        if row:
+            return json.loads(row[0])
+
+    metrics = compute_metrics(conn)
+    conn.execute('''
+        INSERT INTO metrics_snapshots (update_log_id, metrics_version, metrics) VALUES (?, ?, ?)
+        ON CONFLICT(update_log_id, metrics_version) DO UPDATE SET metrics = excluded.metrics, created_at = CURRENT_TIMESTAMP
+    ''', (update_id, METRICS_VERSION, json.dumps(metrics, separators=(',', ':'), ensure_ascii=False)))
+    conn.commit()
+    return metrics
+
+def load_metrics(db_path, conn=None):
+    """get_metrics() on conn, or on a short-lived connection to db_path"""
+    if conn is not None:
+        return get_metrics(conn)
+    conn = sqlite3.connect(db_path)
+    metrics = get_metrics(conn)
+    conn.close()
+    return metrics
+
+def db_size_mb(db_path):
+    return round(os.path.getsize(db_path) / 1024 / 1024, 2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute or show the metrics snapshot")
+    parser.add_argument("--refresh", action="store_true", help="recompute even if a snapshot exists")
+    args = parser.parse_args()
+    print(f"📐 DATABASE METRICS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    conn = sqlite3.connect(resolve_db_path())
+    print(json.dumps(get_metrics(conn, refresh=args.refresh), indent=2, ensure_ascii=False))
+    conn.close()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Bulk Database Writer
+Holds one SQLite connection for a whole run, stages rows in memory and
+flushes them with executemany inside large transactions
+Upsert statements only touch rows whose values changed and are counted
+as inserted, updated or unchanged
+"""
+
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from create_schema import resolve_db_path
+
+BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "2000"))
+COMMIT_EVERY = int(os.getenv("DB_COMMIT_EVERY", "50000"))
+
+def connect(db_path=None):
+    """Open a connection tuned for bulk writes"""
+    conn = sqlite3.connect(db_path or resolve_db_path())
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA cache_size=-65536')  # 64 MB page cache
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def finalize(conn):
+    """Fold the WAL back into the main file and close.
+
+    The database is shipped as a single file in git and releases, so the
+    journal mode is switched back to DELETE once the run is done. While
+    another process (e.g. read_api.py) has it open, it is left in WAL mode.
+    """
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    try:
+        conn.execute('PRAGMA journal_mode=DELETE')
+    except sqlite3.OperationalError as e:
+        if 'locked' not in str(e):
+            raise
+        print("⚠️ Database is open in another process; left in WAL mode")
+    conn.close()
+
+class Upsert:
+    """INSERT ... ON CONFLICT DO UPDATE that skips rows with no changed column"""
+
+    def __init__(self, table, columns, key, update_columns=None):
+        self.table = table
+        self.columns = list(columns)
+        self.key = list(key)
+        self.key_positions = [self.columns.index(k) for k in self.key]
+        update_columns = update_columns or [c for c in self.columns if c not in self.key]
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+        changed = " OR ".join(f"{table}.{c} IS NOT excluded.{c}" for c in update_columns)
+        self.conflict = f"ON CONFLICT({', '.join(self.key)}) DO UPDATE SET {assignments} WHERE {changed}"
+        self.sql = (
+            f"INSERT INTO {table} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join('?' for _ in self.columns)}) {self.conflict}"
+        )
+
+    def from_select(self, source):
+        """The same upsert fed by a SELECT that returns self.columns in order"""
+        # "WHERE true" keeps ON CONFLICT from being parsed as part of the SELECT
+        return f"INSERT INTO {self.table} ({', '.join(self.columns)}) SELECT * FROM ({source}) WHERE true {self.conflict}"
+
+    def row_key(self, params):
+        return tuple(params[i] for i in self.key_positions)
+
+    def lookup_sql(self, count):
+        """SELECT of the key columns for rows whose first key column is one of count values"""
+        return f"SELECT {', '.join(self.key)} FROM {self.table} WHERE {self.key[0]} IN ({', '.join('?' for _ in range(count))})"
+
+    def existing_keys(self, conn, keys):
+        """Return the subset of keys already present in the table"""
+        found = set()
+        first_values = list({k[0] for k in keys})
+        for start in range(0, len(first_values), 500):
+            chunk = first_values[start:start + 500]
+            rows = conn.execute(self.lookup_sql(len(chunk)), chunk)
+            found.update(tuple(row) for row in rows)
+        return found & keys
+
+# Upserts shared by the population scripts
+# main_competition_id is only taken from the row that inserts the team; afterwards
+# MAIN_COMPETITION_SQL owns it, so fetch order never decides a team's main competition
+TEAM_UPSERT = Upsert('teams', [
+    'id', 'name', 'name_for_url', 'country_id', 'main_competition_id', 'image_version', 'is_national'
+], key=['id'], update_columns=['name', 'name_for_url', 'country_id', 'image_version', 'is_national'])
+
+# A team's main competition is the most popular one it plays in this season
+# (365Scores popularityRank grows with popularity), lowest id on ties.
+# Teams with no current-season link keep the value they have
+MAIN_COMPETITION_SQL = '''
+    UPDATE teams SET main_competition_id = ranked.competition_id
+    FROM (
+        SELECT tc.team_id, tc.competition_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY tc.team_id ORDER BY c.popularity_rank IS NULL, c.popularity_rank DESC, c.id
+               ) AS pick
+        FROM team_competitions tc
+        JOIN competitions c ON c.id = tc.competition_id
+        WHERE tc.is_active = 1
+          AND (tc.season_num IS NULL OR c.current_season_num IS NULL OR tc.season_num = c.current_season_num)
+    ) AS ranked
+    WHERE ranked.team_id = teams.id AND ranked.pick = 1
+      AND teams.main_competition_id IS NOT ranked.competition_id
+'''
+
+def assign_main_competitions(conn):
+    """Apply MAIN_COMPETITION_SQL; returns the number of teams whose main competition moved"""
+    return conn.execute(MAIN_COMPETITION_SQL).rowcount
+
+TEAM_COMPETITION_UPSERT = Upsert('team_competitions', [
+    'team_id', 'competition_id', 'season_num', 'is_active'
+], key=['team_id', 'competition_id', 'season_num'])
+
+# UNIQUE(team_id, competition_id, season_num) never matches a NULL season,
+# so links without a known season are only inserted when missing
+TEAM_COMPETITION_NO_SEASON_SQL = '''
+    INSERT INTO team_competitions (team_id, competition_id, season_num, is_active)
+    SELECT ?, ?, NULL, 1
+    WHERE NOT EXISTS (
+        SELECT 1 FROM team_competitions WHERE team_id = ? AND competition_id = ? AND season_num IS NULL
+    )
+'''
+
+# Picklable snapshot of a writer's counters, e.g. from a worker process
+WriterTotals = namedtuple('WriterTotals', ['rows_written', 'flushes', 'commits', 'write_seconds', 'commit_seconds'])
+
+class BulkWriter:
+    """Stages INSERT/UPDATE rows per statement and writes them in batches"""
+
+    def __init__(self, db_path=None, batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY, conn=None):
+        self.db_path = db_path or resolve_db_path()
+        # A connection passed in stays open after close(); its owner finalizes it
+        self.owns_conn = conn is None
+        self.conn = connect(self.db_path) if conn is None else conn
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self._pending = {}
+        self._staged = 0
+        self._uncommitted = 0
+        self.rows_staged = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.commits = 0
+        self.write_seconds = 0.0
+        self.commit_seconds = 0.0
+        self.counts = {}
+        self._opened_at = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def stage(self, sql, params):
+        """Queue one row for a statement (SQL text or Upsert); flushes once the batch is full"""
+        self._pending.setdefault(sql, []).append(params)
+        self._staged += 1
+        self.rows_staged += 1
+        if self._staged >= self.batch_size:
+            self.flush()
+
+    def stage_many(self, sql, rows):
+        for params in rows:
+            self.stage(sql, params)
+
+    def flush(self):
+        """Write all staged rows grouped by statement, each statement's rows in staging order.
+
+        Statements run in the order they were first staged, so rows of different
+        statements are not interleaved as staged; callers must not rely on
+        ordering across statements (e.g. a delete followed by a re-insert of
+        the same key).
+        """
+        if not self._staged:
+            return
+        started = time.perf_counter()
+        for statement, rows in self._pending.items():
+            if isinstance(statement, Upsert):
+                self._write_upserts(statement, rows)
+            else:
+                self.conn.executemany(statement, rows)
+        self.write_seconds += time.perf_counter() - started
+        self.rows_written += self._staged
+        self._uncommitted += self._staged
+        self.flushes += 1
+        self._pending = {}
+        self._staged = 0
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def _write_upserts(self, upsert, rows):
+        """Write a batch of upserts and tally inserted/updated/unchanged rows"""
+        keys = {upsert.row_key(params) for params in rows}
+        inserted = len(keys - upsert.existing_keys(self.conn, keys))
+        changed = self.conn.executemany(upsert.sql, rows).rowcount
+        counts = self.counts.setdefault(upsert.table, {'inserted': 0, 'updated': 0, 'unchanged': 0})
+        counts['inserted'] += inserted
+        counts['updated'] += changed - inserted
+        counts['unchanged'] += len(rows) - changed
+
+    def commit(self):
+        """Flush and end the current transaction"""
+        self.flush()
+        started = time.perf_counter()
+        self.conn.commit()
+        self.commit_seconds += time.perf_counter() - started
+        self.commits += 1
+        self._uncommitted = 0
+
+    def close(self):
+        """Commit, then finalize the connection if this writer opened it"""
+        self.commit()
+        if self.owns_conn:
+            finalize(self.conn)
+
+    def abort(self):
+        """Drop staged and uncommitted rows and close"""
+        self._pending = {}
+        self._staged = 0
+        self.conn.rollback()
+        if self.owns_conn:
+            self.conn.close()
+
+    def totals(self):
+        return WriterTotals(self.rows_written, self.flushes, self.commits, self.write_seconds, self.commit_seconds)
+
+    def report(self):
+        """Print rows written and throughput"""
+        elapsed = time.perf_counter() - self._opened_at
+        rate = self.rows_written / self.write_seconds if self.write_seconds else 0
+        print(f"\n💾 WRITE SUMMARY")
+        print(f"   Rows written: {self.rows_written:,} in {self.flushes} batches, {self.commits} commits")
+        print(f"   Write time: {self.write_seconds:.3f}s ({rate:,.0f} rows/sec), commits {self.commit_seconds:.3f}s, "
+              f"connection open {elapsed:.1f}s")
+        for table, counts in self.counts.items():
+            print(f"   {table}: {counts['inserted']:,} inserted, {counts['updated']:,} updated, {counts['unchanged']:,} unchanged")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+teams_master.json Export
+Streams master/teams_master.json straight from the database, one team at a
+time, and writes it atomically. Triggers queue every team whose underlying
+rows changed in export_dirty; later exports only regenerate those entries and
+copy the rest byte for byte from the previous file using its offset index.
+That only holds for the file this database last exported (export_state);
+any other file, or a database that never exported, gets a full export
+With --format v2 the normalized encoding from teams_master_format is written
+instead, optionally gzip or zstd compressed
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import groupby
+
+from create_schema import resolve_db_path, create_export_tracking
+from teams_master_format import open_output, write_v2
+from teams_master_index import build_index, file_digest, load_index, postings, resolve_master_path, write_index
+
+# Matches the committed file: json.dumps(..., indent=2, ensure_ascii=False) with CRLF
+NEWLINE = "\r\n"
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+def v2_path_for(json_path, compression=None):
+    return os.path.splitext(json_path)[0] + ".v2.json" + COMPRESSION_SUFFIXES[compression]
+
+TEAM_ROWS_SQL = '''
+    SELECT t.id, t.name, t.country_id, tco.name, t.main_competition_id,
+           c.id, c.name, c.long_name, c.country_id, cco.name, c.popularity_rank,
+           c.has_standings, c.has_live_standings, c.has_standings_groups, c.has_brackets,
+           c.has_stats, c.has_history, c.is_international, MAX(tc.is_active)
+    FROM teams t
+    LEFT JOIN countries tco ON tco.id = t.country_id
+    LEFT JOIN team_competitions tc ON tc.team_id = t.id
+    LEFT JOIN competitions c ON c.id = tc.competition_id
+    LEFT JOIN countries cco ON cco.id = c.country_id
+    {where}
+    GROUP BY t.id, c.id
+    ORDER BY t.id, c.popularity_rank, c.id
+'''
+
+COMPETITION_TEAMS_SQL = '''
+    SELECT DISTINCT tc.competition_id, tc.team_id
+    FROM team_competitions tc
+    JOIN competitions c ON c.id = tc.competition_id
+    ORDER BY tc.team_id, tc.competition_id
+'''
+
+def _flag(value):
+    return None if value is None else bool(value)
+
+def build_entry(rows):
+    """Build one team's teams_master entry from its joined rows"""
+    rows = list(rows)
+    team_id, team_name, country_id, country_name, main_competition_id = rows[0][:5]
+    competitions = []
+    for row in rows:
+        if row[5] is None:
+            continue
+        competitions.append({
+            "competition_id": row[5],
+            "competition_name": row[6],
+            "long_name": row[7],
+            "country_id": row[8],
+            "country_name": row[9],
+            "popularity_rank": row[10],
+            "has_standings": _flag(row[11]),
+            "has_live_standings": _flag(row[12]),
+            "has_standings_groups": _flag(row[13]),
+            "has_brackets": _flag(row[14]),
+            "has_stats": _flag(row[15]),
+            "has_history": _flag(row[16]),
+            "is_international": _flag(row[17]),
+            "is_active": _flag(row[18]),
+            "is_main_competition": row[5] == main_competition_id,
+        })
+    return {
+        "team_id": team_id,
+        "team_name": team_name,
+        "country_id": country_id,
+        "country_name": country_name,
+        "main_competition_id": main_competition_id,
+        "competitions": competitions,
+        "total_competitions": len(competitions),
+    }
+
+def iter_team_entries(conn, where="", params=()):
+    """Yield (team_id, entry) in team_id order without loading all teams"""
+    cursor = conn.execute(TEAM_ROWS_SQL.format(where=where), params)
+    for team_id, rows in groupby(cursor, key=lambda row: row[0]):
+        yield team_id, build_entry(rows)
+
+def serialize_entry(entry):
+    """Encode one entry exactly as it sits inside the top-level list"""
+    text = json.dumps(entry, indent=2, ensure_ascii=False)
+    return ("  " + text.replace("\n", NEWLINE + "  ")).encode("utf-8")
+
+EXPORT_STATE_UPSERT_SQL = '''
+    INSERT INTO export_state (id, sha256) VALUES (1, ?)
+    ON CONFLICT (id) DO UPDATE SET sha256 = excluded.sha256, exported_at = CURRENT_TIMESTAMP
+'''
+
+def previous_export_index(conn, json_path):
+    """Offset index of json_path if it is the file this database last exported, else None.
+
+    A missing or stale index (e.g. on a fresh checkout) is rebuilt from one
+    scan, but only once the file's hash matches the recorded export.
+    """
+    row = conn.execute("SELECT sha256 FROM export_state WHERE id = 1").fetchone()
+    if row is None or not os.path.exists(json_path):
+        print("ℹ️ No previous export from this database, exporting everything")
+        return None
+    index = load_index(json_path)
+    if index is not None and index["source"]["sha256"] == row[0]:
+        return index
+    if file_digest(json_path) != row[0]:
+        print("ℹ️ teams_master.json differs from this database's last export, exporting everything")
+        return None
+    try:
+        return build_index(json_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Could not index the previous file ({e}), exporting everything")
+        return None
+
+def export_teams_master(db_path=None, json_path=None, full=False):
+    """Write teams_master.json, regenerating only dirty teams when possible"""
+    db_path = db_path or resolve_db_path()
+    json_path = json_path or resolve_master_path()
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(db_path)
+    create_export_tracking(conn.cursor())
+    conn.commit()
+
+    index = None if full else previous_export_index(conn, json_path)
+    incremental = index is not None
+    old_offsets = index["teams"] if incremental else {}
+    dirty_where = "WHERE t.id IN (SELECT team_id FROM export_dirty)" if incremental else ""
+
+    print(f"📝 Exporting {json_path} ({'incremental' if incremental else 'full'})")
+
+    regenerated = copied = 0
+    offsets = {}
+    tmp_path = json_path + ".tmp"
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+
+    with open(json_path, "rb") if incremental else nullcontext() as old_file, \
+            open(tmp_path, "wb") as out:
+        old = mmap.mmap(old_file.fileno(), 0, access=mmap.ACCESS_READ) if incremental and os.path.getsize(json_path) else None
+        fresh = iter_team_entries(conn, dirty_where)
+        next_fresh = next(fresh, None)
+
+        out.write(b"[")
+        first = True
+        for (team_id,) in conn.execute("SELECT id FROM teams ORDER BY id"):
+            key = str(team_id)
+            if next_fresh and next_fresh[0] == team_id:
+                data = serialize_entry(next_fresh[1])
+                next_fresh = next(fresh, None)
+                regenerated += 1
+            elif key in old_offsets and old is not None:
+                offset, length = old_offsets[key]
+                data = old[offset:offset + length]
+                copied += 1
+            else:
+                # Missing from the previous file but never marked dirty
+                _, entry = next(iter_team_entries(conn, "WHERE t.id = ?", (team_id,)))
+                data = serialize_entry(entry)
+                regenerated += 1
+
+            out.write((NEWLINE if first else "," + NEWLINE).encode("utf-8"))
+            first = False
+            offsets[key] = [out.tell(), len(data)]
+            out.write(data)
+        out.write(b"]" if first else (NEWLINE + "]").encode("utf-8"))
+
+        out.flush()
+        os.fsync(out.fileno())
+        if old is not None:
+            old.close()
+
+    os.replace(tmp_path, json_path)
+    index = write_index(json_path, offsets,
+                        postings(conn.execute("SELECT country_id, id FROM teams ORDER BY id")),
+                        postings(conn.execute(COMPETITION_TEAMS_SQL)))
+
+    conn.execute(EXPORT_STATE_UPSERT_SQL, (index["source"]["sha256"],))
+    conn.execute("DELETE FROM export_dirty")
+    conn.commit()
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"  ✅ {len(offsets):,} teams ({regenerated:,} regenerated, {copied:,} copied) in {elapsed:.2f}s")
+    return len(offsets)
+
+def export_teams_master_v2(db_path=None, out_path=None, compression=None):
+    """Write the normalized v2 teams_master, streaming teams from the database"""
+    db_path = db_path or resolve_db_path()
+    out_path = out_path or v2_path_for(resolve_master_path(), compression)
+    started = time.perf_counter()
+    print(f"📝 Exporting {out_path} (v2{', ' + compression if compression else ''})")
+
+    conn = sqlite3.connect(db_path)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open_output(tmp_path, compression) as out:
+        count = write_v2(out, (entry for _, entry in iter_team_entries(conn)))
+    conn.close()
+    os.replace(tmp_path, out_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"  ✅ {count:,} teams, {os.path.getsize(out_path):,} bytes in {elapsed:.2f}s")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export master/teams_master.json from the database")
+    parser.add_argument("--full", action="store_true", help="regenerate every team entry")
+    parser.add_argument("--format", choices=["v1", "v2"], default="v1", help="v2 writes the normalized encoding")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], help="compress the v2 output")
+    args = parser.parse_args()
+    print(f"📦 TEAMS MASTER EXPORT - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    if args.format == "v2":
+        export_teams_master_v2(compression=args.compress)
+    else:
+        export_teams_master(full=args.full)
@@ -6,235 +6,333 @@ This is a comprehensive one-time setup script
 """
 
 import sqlite3
-import requests
-import json
-import time
+import argparse
 import os
 from datetime import datetime
 
+import requests
+
+from create_schema import create_update_tables, create_export_tracking, create_search_index, create_change_tracking, create_aggregate_tables
+from migrations import migrate
+from api_client import make_api_request, get_client, competitions_url, standings_url, ApiError
+from ingest_pipeline import IngestPipeline
+from run_metrics import RunMetrics
+from profiling import profile_run
+from standings_history import sync_seasons
+from db_writer import BulkWriter, Upsert, TEAM_UPSERT, TEAM_COMPETITION_UPSERT, TEAM_COMPETITION_NO_SEASON_SQL, assign_main_competitions
+
 def resolve_db_path():
     workspace = os.getenv("GITHUB_WORKSPACE")
     if workspace:
         return os.path.join(workspace, "new_project", "db", "soccer_data_colab.db")
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "new_project", "db", "soccer_data_colab.db"))
 
-# 365Scores API Configuration
-LANG_ID = 9
-TZ_NAME = "UTC"
-USER_COUNTRY_ID = 331
-APP_ID = 5
-
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Mobile Safari/537.36',
-    'Accept': '*/*',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Accept-Encoding': 'gzip, deflate, br, zstd',
-    'Cache-Control': 'no-cache',
-    'Pragma': 'no-cache',
-    'Origin': 'https://www.365scores.com',
-    'Referer': 'https://www.365scores.com/',
-    'Sec-Ch-Ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
-    'Sec-Ch-Ua-Mobile': '?1',
-    'Sec-Ch-Ua-Platform': '"Android"',
-    'Sec-Fetch-Dest': 'empty',
-    'Sec-Fetch-Mode': 'cors',
-    'Sec-Fetch-Site': 'same-site'
-}
-
 DB_PATH = resolve_db_path()
 
-def make_api_request(url, description=""):
-    """Make API request with error handling"""
-    try:
-        print(f"  🌐 {description}...")
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"    ❌ HTTP {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"    ❌ Error: {str(e)}")
-        return None
+# Progress checkpoints: commit every N competitions, give up on an item after N attempts
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "25"))
+MAX_ATTEMPTS = int(os.getenv("POPULATION_MAX_ATTEMPTS", "5"))
 
-def fetch_countries_from_api():
-    """Fetch all countries from 365Scores API"""
-    print("🌍 Fetching countries from API...")
-    
-    # Get countries from a competition search or standings endpoint
-    url = f"https://webws.365scores.com/web/competitions/?appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}"
-    data = make_api_request(url, "Countries from competitions")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    countries_added = 0
-    if data and 'countries' in data:
-        for country in data['countries']:
-            cursor.execute('''
-                INSERT OR REPLACE INTO countries 
-                (id, name, name_for_url, image_version) 
-                VALUES (?, ?, ?, ?)
-            ''', (country.get('id'), country.get('name'), country.get('nameForURL'), country.get('imageVersion', 1)))
-            countries_added += 1
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"  ✅ Added {countries_added} countries")
-    return countries_added
+# Worker processes for the team phase (see sharded_ingest.py); 0 means one per CPU
+POPULATION_SHARDS = int(os.getenv("POPULATION_SHARDS", "1"))
 
-def fetch_all_competitions_from_api():
-    """Fetch ALL competitions from 365Scores API"""
-    print("🏆 Fetching all competitions from API...")
-    
-    url = f"https://webws.365scores.com/web/competitions/?appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}"
-    data = make_api_request(url, "All competitions")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    competitions_added = 0
-    if data and 'competitions' in data:
-        for comp in data['competitions']:
-            cursor.execute('''
-                INSERT OR REPLACE INTO competitions 
-                (id, country_id, sport_id, name, long_name, name_for_url, 
-                 has_standings, has_brackets, has_stats, popularity_rank, 
-                 image_version, is_international) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                comp.get('id'), 
-                comp.get('countryId'), 
-                comp.get('sportId', 1),  # Default to soccer
-                comp.get('name'), 
-                comp.get('longName'),
-                comp.get('nameForURL'),
-                comp.get('hasStandings', False),
-                comp.get('hasBrackets', False), 
-                comp.get('hasStats', False),
-                comp.get('popularityRank', 999),
-                comp.get('imageVersion', 1),
-                comp.get('isInternational', False)
-            ))
-            competitions_added += 1
+COUNTRY_UPSERT = Upsert('countries', ['id', 'name', 'name_for_url', 'image_version'], key=['id'])
+
+COMPETITION_UPSERT = Upsert('competitions', [
+    'id', 'country_id', 'sport_id', 'name', 'long_name', 'name_for_url',
+    'has_standings', 'has_brackets', 'has_stats', 'popularity_rank',
+    'image_version', 'is_international', 'current_season_num'
+], key=['id'])
+
+def country_row(country):
+    return (country.get('id'), country.get('name'), country.get('nameForURL'), country.get('imageVersion', 1))
+
+def competition_row(comp):
+    return (
+        comp.get('id'), 
+        comp.get('countryId'), 
+        comp.get('sportId', 1),  # Default to soccer
+        comp.get('name'), 
+        comp.get('longName'),
+        comp.get('nameForURL'),
+        comp.get('hasStandings', False),
+        comp.get('hasBrackets', False), 
+        comp.get('hasStats', False),
+        comp.get('popularityRank', 999),
+        comp.get('imageVersion', 1),
+        comp.get('isInternational', False),
+        comp.get('currentSeasonNum')
+    )
+
+def fetch_catalogue_from_api(writer):
+    """Fetch ALL countries and competitions from 365Scores API in one streamed request.
+
+    Each record is staged as soon as it is parsed, so the writer starts
+    inserting while the catalogue is still downloading. Returns
+    (countries_added, competitions_added).
+    """
+    print("🌍 Fetching countries and competitions from API...")
     
-    conn.commit()
-    conn.close()
+    added = {'countries': 0, 'competitions': 0}
+    try:
+        print("  🌐 Countries and competitions...")
+        for key, record in get_client().stream_json_arrays(competitions_url(), ('countries', 'competitions')):
+            if key == 'countries':
+                writer.stage(COUNTRY_UPSERT, country_row(record))
+            else:
+                writer.stage(COMPETITION_UPSERT, competition_row(record))
+            added[key] += 1
+    except requests.exceptions.RequestException as e:
+        print(f"    ❌ Request failed: {e}")
+    except ApiError as e:
+        print(f"    ❌ {e}")
+    except ValueError as e:
+        print(f"    ❌ Invalid response: {e}")
+    
+    print(f"  ✅ Added {added['countries']} countries")
+    print(f"  ✅ Added {added['competitions']} competitions")
+    return added['countries'], added['competitions']
+
+def parse_standings_teams(data):
+    """Extract (season_num, team dicts) from a standings payload.
+
+    Standings groups list their teams either as rows[].competitor or as a
+    flat competitors[] array; both shapes are accepted.
+    """
+    season_num = None
+    teams = []
+    if not data:
+        return season_num, teams
+    
+    if data.get('competitions'):
+        season_num = data['competitions'][0].get('currentSeasonNum')
+    
+    for standing_group in data.get('standings', []):
+        competitors = standing_group.get('competitors') or [
+            row.get('competitor') for row in standing_group.get('rows', [])
+        ]
+        for team_data in competitors:
+            if team_data and team_data.get('id'):
+                teams.append(team_data)
+    return season_num, teams
+
+def team_row(team_data, comp_id):
+    """TEAM_UPSERT parameters for one standings competitor"""
+    return (
+        team_data['id'],
+        team_data.get('name'),
+        team_data.get('nameForURL'),
+        team_data.get('countryId'),
+        comp_id,
+        team_data.get('imageVersion', 1),
+        team_data.get('isNational', False)
+    )
+
+def store_teams_for_competition(comp_id, comp_name, season_num, teams, writer):
+    """Stage the teams and team-competition links for one competition"""
+    # Resolve the season once for the whole competition: payload first, then database
+    if season_num is None:
+        row = writer.conn.execute('SELECT current_season_num FROM competitions WHERE id = ?', (comp_id,)).fetchone()
+        season_num = row[0] if row else None
+    
+    for team_data in teams:
+        team_id = team_data['id']
+        writer.stage(TEAM_UPSERT, team_row(team_data, comp_id))
+        
+        # Link team to competition
+        if season_num is not None:
+            writer.stage(TEAM_COMPETITION_UPSERT, (team_id, comp_id, season_num, 1))
+        else:
+            writer.stage(TEAM_COMPETITION_NO_SEASON_SQL, (team_id, comp_id, team_id, comp_id))
     
-    print(f"  ✅ Added {competitions_added} competitions")
-    return competitions_added
+    print(f"  ✅ Added {len(teams)} teams for {comp_name}")
+    return len(teams)
 
-def fetch_teams_for_competition(comp_id, comp_name):
+def fetch_teams_for_competition(comp_id, comp_name, writer):
     """Fetch all teams for a specific competition"""
-    print(f"� Fetching teams for {comp_name}...")
-    
-    # Try standings first
-    url = f"https://webws.365scores.com/web/standings/?competitions={comp_id}&live=false&appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}"
-    data = make_api_request(url, f"Teams for {comp_name}")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    teams_added = 0
-    
-    if data and 'standings' in data:
-        for standing_group in data['standings']:
-            if 'competitors' in standing_group:
-                for team_data in standing_group['competitors']:
-                    team_id = team_data.get('id')
-                    if team_id:
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO teams 
-                            (id, name, name_for_url, country_id, main_competition_id, image_version, is_national)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            team_id,
-                            team_data.get('name'),
-                            team_data.get('nameForURL'),
-                            team_data.get('countryId'),
-                            comp_id,
-                            team_data.get('imageVersion', 1),
-                            team_data.get('isNational', False)
-                        ))
-                        
-                        # Link team to competition
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO team_competitions 
-                            (team_id, competition_id, is_active)
-                            VALUES (?, ?, 1)
-                        ''', (team_id, comp_id))
-                        
-                        teams_added += 1
+    print(f"👥 Fetching teams for {comp_name}...")
     
+    data = make_api_request(standings_url(comp_id), f"Teams for {comp_name}")
+    season_num, teams = parse_standings_teams(data)
+    return store_teams_for_competition(comp_id, comp_name, season_num, teams, writer)
+
+RESUMABLE_WORK_SQL = '''
+    SELECT c.id, c.name
+    FROM population_progress p
+    JOIN competitions c ON c.id = p.competition_id
+    WHERE p.status != 'done' AND p.attempts < ?
+    ORDER BY c.popularity_rank DESC NULLS LAST, c.id
+'''
+
+SEED_PROGRESS_SQL = '''
+    INSERT INTO population_progress (competition_id, status, attempts)
+    SELECT id, 'pending', 0 FROM competitions WHERE has_standings = 1
+'''
+
+PROGRESS_SUMMARY_SQL = 'SELECT status, COUNT(*) FROM population_progress GROUP BY status'
+
+def load_resumable_work(conn):
+    """Return competitions still pending or failed from an interrupted run"""
+    return conn.execute(RESUMABLE_WORK_SQL, (MAX_ATTEMPTS,)).fetchall()
+
+def seed_progress(conn):
+    """Start a clean run: mark every competition with standings as pending"""
+    conn.execute('DELETE FROM population_progress')
+    conn.execute(SEED_PROGRESS_SQL)
     conn.commit()
-    conn.close()
-    
-    print(f"  ✅ Added {teams_added} teams for {comp_name}")
-    return teams_added
 
-def populate_from_api():
-    """Populate entire database from 365Scores API"""
+def record_progress(writer, comp_id, error=None):
+    """Stage a competition's outcome in the same transaction as its rows"""
+    writer.stage('''
+        UPDATE population_progress
+        SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE competition_id = ?
+    ''', ('failed' if error else 'done', str(error) if error else None, comp_id))
+
+def progress_summary(conn):
+    return dict(conn.execute(PROGRESS_SUMMARY_SQL))
+
+def populate_teams(competitions):
+    """Fetch and store the teams of every competition in this process.
+
+    Returns (teams_added, competitions_done, pipeline, writers).
+    """
+    total_teams = 0
+    jobs = [(standings_url(comp_id), comp_id, comp_name) for comp_id, comp_name in competitions]
+    completed = 0
+    
+    def fetch(job):
+        url, comp_id, comp_name = job
+        print(f"  🌐 Teams for {comp_name}...")
+        return parse_standings_teams(get_client().fetch_json(url))
+    
+    def write(team_writer, job, result, error):
+        nonlocal total_teams, completed
+        _, comp_id, comp_name = job
+        staged = team_writer.rows_staged
+        if error is not None:
+            print(f"  ❌ {comp_name}: {error}")
+            record_progress(team_writer, comp_id, error)
+            return team_writer.rows_staged - staged
+        season_num, teams = result
+        added = store_teams_for_competition(comp_id, comp_name, season_num, teams, team_writer)
+        record_progress(team_writer, comp_id)
+        total_teams += added
+        completed += 1
+        if completed % CHECKPOINT_EVERY == 0:
+            team_writer.commit()
+        return team_writer.rows_staged - staged
+    
+    team_writers = []
+    
+    def open_writer():
+        team_writers.append(BulkWriter(DB_PATH))
+        return team_writers[-1]
+    
+    pipeline = IngestPipeline(fetch, write, open_writer, close_writer=lambda w: w.close())
+    pipeline.run(jobs)
+    
+    return total_teams, completed, pipeline, team_writers
+
+def populate_from_api(fresh=False, shards=1):
+    """Populate entire database from 365Scores API.
+
+    Resumes pending/failed competitions left by an interrupted run unless
+    ``fresh`` is set.
+    """
     
     print("🌐 Populating ENTIRE database from 365Scores API...")
     
     total_countries = 0
     total_competitions = 0
     total_teams = 0
+    metrics = RunMetrics()
+    
+    writer = BulkWriter(DB_PATH)
+    with metrics.span('schema_check'):
+        create_update_tables(writer.conn.cursor())
+        create_export_tracking(writer.conn.cursor())
+        create_search_index(writer.conn.cursor())
+        create_change_tracking(writer.conn.cursor())
+        create_aggregate_tables(writer.conn.cursor())
+        migrate(writer.conn)
+    
+    # Shards of a killed sharded run hold finished competitions not yet in population_progress
+    writer.commit()
+    from sharded_ingest import merge_interrupted_shards
+    merge_interrupted_shards(DB_PATH, writer.conn, discard=fresh)
+    
+    with metrics.span('competition_selection'):
+        competitions_to_process = [] if fresh else load_resumable_work(writer.conn)
+    if competitions_to_process:
+        print(f"♻️ Resuming interrupted run: {len(competitions_to_process)} competitions pending or failed")
+    else:
+        # Steps 1-2: Stream countries and competitions from the catalogue
+        total_countries, total_competitions = fetch_catalogue_from_api(writer)
+        
+        # Step 3: Checkpoint every competition with standings, then fetch teams
+        writer.commit()
+        with metrics.span('competition_selection'):
+            seed_progress(writer.conn)
+            competitions_to_process = load_resumable_work(writer.conn)
     
-    # Step 1: Fetch countries
-    total_countries = fetch_countries_from_api()
-    time.sleep(2)
+    writer.close()
+    writer.report()
     
-    # Step 2: Fetch all competitions
-    total_competitions = fetch_all_competitions_from_api()
-    time.sleep(2)
+    print(f"📊 Processing {len(competitions_to_process)} competitions for teams...")
+    if shards > 1:
+        from sharded_ingest import populate_sharded
+        total_teams, completed, request_stats, team_writers = populate_sharded(
+            DB_PATH, competitions_to_process, shards, metrics)
+        pipeline = None
+    else:
+        total_teams, completed, pipeline, team_writers = populate_teams(competitions_to_process)
+        request_stats = get_client().stats
     
-    # Step 3: For each competition with standings, fetch teams
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get competitions that likely have standings
-    cursor.execute('''
-        SELECT id, name, has_standings, popularity_rank 
-        FROM competitions 
-        WHERE has_standings = 1 
-        ORDER BY popularity_rank ASC NULLS LAST
-        LIMIT 50
-    ''')
-    
-    competitions_to_process = cursor.fetchall()
+    progress = progress_summary(conn)
+    sync_seasons(conn)
+    assign_main_competitions(conn)
+    cursor = conn.execute('''
+        INSERT INTO update_log (update_type, competitions_processed, teams_updated, competitions_skipped)
+        VALUES (?, ?, ?, ?)
+    ''', ('full_population', completed, total_teams, 0))
+    conn.commit()
     conn.close()
-    
-    print(f"📊 Processing {len(competitions_to_process)} competitions for teams...")
-    
-    for comp_id, comp_name, has_standings, popularity in competitions_to_process:
-        teams_count = fetch_teams_for_competition(comp_id, comp_name)
-        total_teams += teams_count
-        time.sleep(1.5)  # Rate limiting
+    metrics.store(DB_PATH, cursor.lastrowid, request_stats, [writer] + team_writers)
     
     print(f"\n🎉 API Population complete!")
     print(f"  🌍 Countries: {total_countries}")
     print(f"  🏆 Competitions: {total_competitions}")  
     print(f"  👥 Teams: {total_teams}")
-    
-    return True
+    print(f"  ✅ Progress: {progress.get('done', 0)} done, {progress.get('failed', 0)} failed, {progress.get('pending', 0)} pending")
+    request_stats.report()
+    if pipeline:
+        pipeline.report()
+        for team_writer in team_writers:
+            team_writer.report()
+    
+    return not progress.get('failed') and not progress.get('pending')
 
-def main():
-    """Main population function"""
+def resolve_shards(shards):
+    """Worker process count; 0 means one per CPU"""
+    if shards == 0:
+        return os.cpu_count() or 1
+    return max(1, shards)
+
+def main(fresh=False, shards=1):
+    """Main population function; returns False unless every competition is done"""
     
     print(f"🚀 FULL DATABASE POPULATION - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print("="*70)
     
     if not os.path.exists(DB_PATH):
         print("❌ Database not found! Please run create_schema.py first.")
-        return
+        return False
     
     # Populate entire database from 365Scores API
     print("🌐 Starting comprehensive database population from API...")
-    populate_from_api()
+    complete = populate_from_api(fresh=fresh, shards=resolve_shards(shards))
     
     # Generate final summary
     conn = sqlite3.connect(DB_PATH)
@@ -259,7 +357,21 @@ def main():
     print(f"  🏆 Competitions: {comp_count}")
     print(f"  👥 Teams: {team_count}")  
     print(f"  🔗 Team-Competition links: {tc_count}")
+    if not complete:
+        print("\n⚠️ Some competitions are failed or pending; re-run to resume")
+        return False
     print("\n🎉 Database is ready for daily updates!")
+    return True
 
 if __name__ == "__main__":
-    main()
+    # profile_run strips --profile from argv before argparse sees it
+    with profile_run("full_database_population"):
+        parser = argparse.ArgumentParser(description="Populate the database from the 365Scores API")
+        parser.add_argument("--fresh", action="store_true",
+                            help="ignore any interrupted run and start again from countries")
+        parser.add_argument("--shards", type=int, default=POPULATION_SHARDS,
+                            help="worker processes for the team phase, each writing its own shard (0 = one per CPU)")
+        args = parser.parse_args()
+        success = main(fresh=args.fresh or os.getenv("FRESH_START", "0") == "1", shards=args.shards)
+    if not success:
+        exit(1)
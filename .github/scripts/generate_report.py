@@ -2,12 +2,17 @@
 """
 Generate Update Report
 Creates a summary report of the database update
+from the db_metrics snapshot for the latest update
 """
 
 import sqlite3
 import os
 from datetime import datetime
 
+from db_metrics import get_metrics, db_size_mb
+from run_metrics import recent_runs, TREND_RUNS
+from profiling import profile_run
+
 def resolve_db_path():
     workspace = os.getenv("GITHUB_WORKSPACE")
     if workspace:
@@ -16,15 +21,22 @@ def resolve_db_path():
 
 DB_PATH = resolve_db_path()
 
-def generate_report():
-    """Generate comprehensive update report"""
+def generate_report(conn=None, metrics=None):
+    """Generate comprehensive update report, reusing conn and metrics when given"""
     
     if not os.path.exists(DB_PATH):
         print("❌ Database file not found!")
         return
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(DB_PATH)
+    if metrics is None:
+        metrics = get_metrics(conn)
+    runs = recent_runs(conn, TREND_RUNS)
+    if own:
+        conn.close()
+    counts = metrics['tables']
     
     print(f"📋 365SCORES DATABASE UPDATE REPORT")
     print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
@@ -44,53 +56,60 @@ def generate_report():
     }
     
     for table, description in tables.items():
-        try:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            print(f"  📊 {description}: {count:,}")
-        except:
+        if table in counts:
+            print(f"  📊 {description}: {counts[table]:,}")
+        else:
             print(f"  ❌ {description}: Table not found")
     
     # Database size
-    size_mb = round(os.path.getsize(DB_PATH) / 1024 / 1024, 2)
+    size_mb = db_size_mb(DB_PATH)
     print(f"  💾 Database size: {size_mb} MB")
     
     # Latest Updates
     print(f"\n⏰ RECENT UPDATE ACTIVITY")
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='update_log'")
-    if cursor.fetchone():
-        cursor.execute("""
-            SELECT update_type, competitions_processed, teams_updated, timestamp 
-            FROM update_log 
-            ORDER BY timestamp DESC 
-            LIMIT 5
-        """)
-        updates = cursor.fetchall()
+    if 'recent_updates' in metrics:
+        updates = metrics['recent_updates']
         
         if updates:
             for update in updates:
-                update_type, comps, teams, timestamp = update
-                print(f"  🔄 {timestamp}: {update_type} - {comps} competitions, {teams} teams")
+                update_type, comps, teams, timestamp, skipped = update
+                print(f"  🔄 {timestamp}: {update_type} - {comps} competitions ({skipped or 0} unchanged), {teams} teams")
         else:
             print(f"  ⚠️ No update records found")
     else:
         print(f"  ⚠️ Update log not available")
     
+    # Run performance trends
+    print(f"\n📈 RUN PERFORMANCE (last {TREND_RUNS} runs)")
+    if runs:
+        for run in runs:
+            phases = run['phases']
+            seconds = lambda phase: phases.get(phase, {}).get('seconds', 0)
+            standings = run['endpoints'].get('/web/standings/', {})
+            print(f"  ⏱️ {run['timestamp']}: {run['update_type']} - {run['wall_seconds']:.1f}s, "
+                  f"{run['requests']} requests, {run['bytes_wire'] / 1024:,.0f} KB, {run['rows_written']:,} rows")
+            print(f"     fetch {seconds('http_fetch'):.1f}s, parse {seconds('json_parse'):.2f}s, "
+                  f"write {seconds('db_write'):.2f}s, commit {seconds('commit'):.2f}s, "
+                  f"standings p50/p95/max {standings.get('p50_s', 0):.2f}/{standings.get('p95_s', 0):.2f}/{standings.get('max_s', 0):.2f}s")
+        latest = runs[0]
+        previous = [run['wall_seconds'] for run in runs[1:] if run['update_type'] == latest['update_type']]
+        if previous:
+            average = sum(previous) / len(previous)
+            change = (latest['wall_seconds'] - average) / average * 100 if average else 0
+            print(f"  📊 Latest {latest['update_type']} run: {latest['wall_seconds']:.1f}s vs "
+                  f"{average:.1f}s average of the previous {len(previous)} ({change:+.0f}%)")
+    else:
+        print(f"  ⚠️ No run metrics recorded yet")
+    
     # Competition Statistics  
     print(f"\n🏆 COMPETITION ANALYSIS")
     
     # Total competitions by feature
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_standings = 1")
-    standings_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_stats = 1")
-    stats_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_brackets = 1")
-    brackets_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM competitions")
-    total_comps = cursor.fetchone()[0]
+    comp_metrics = metrics.get('competitions', {})
+    standings_count = comp_metrics.get('with_standings', 0)
+    stats_count = comp_metrics.get('with_stats', 0)
+    brackets_count = comp_metrics.get('with_brackets', 0)
+    total_comps = counts.get('competitions', 0)
     
     print(f"  📊 With standings: {standings_count}/{total_comps} ({standings_count/total_comps*100:.1f}%)")
     print(f"  📈 With stats: {stats_count}/{total_comps} ({stats_count/total_comps*100:.1f}%)")
@@ -98,14 +117,7 @@ def generate_report():
     
     # Most popular competitions
     print(f"\n⭐ TOP 10 MOST POPULAR COMPETITIONS")
-    cursor.execute("""
-        SELECT name, popularity_rank, has_standings, has_stats 
-        FROM competitions 
-        WHERE popularity_rank IS NOT NULL 
-        ORDER BY popularity_rank ASC 
-        LIMIT 10
-    """)
-    popular = cursor.fetchall()
+    popular = metrics.get('top_competitions', [])
     
     for i, (name, rank, standings, stats) in enumerate(popular, 1):
         features = []
@@ -116,30 +128,17 @@ def generate_report():
     
     # Team Distribution
     print(f"\n🏃 TEAM DISTRIBUTION BY COUNTRY")
-    cursor.execute("""
-        SELECT c.name, COUNT(t.id) as team_count
-        FROM countries c
-        LEFT JOIN teams t ON c.id = t.country_id
-        GROUP BY c.id, c.name
-        HAVING team_count > 0
-        ORDER BY team_count DESC
-        LIMIT 10
-    """)
-    countries = cursor.fetchall()
+    countries = metrics.get('top_countries', [])
     
     for country, count in countries:
         print(f"  🏁 {country[:25]:25}: {count:4d} teams")
     
     # Active Relationships
     print(f"\n🔗 ACTIVE TEAM-COMPETITION RELATIONSHIPS")
-    cursor.execute("SELECT COUNT(*) FROM team_competitions WHERE is_active = 1")
-    active_relations = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(DISTINCT team_id) FROM team_competitions WHERE is_active = 1")
-    active_teams = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(DISTINCT competition_id) FROM team_competitions WHERE is_active = 1")
-    active_competitions = cursor.fetchone()[0]
+    relation_metrics = metrics.get('team_competitions', {})
+    active_relations = relation_metrics.get('active', 0)
+    active_teams = relation_metrics.get('active_teams', 0)
+    active_competitions = relation_metrics.get('active_competitions', 0)
     
     print(f"  🏃 Teams in active competitions: {active_teams:,}")
     print(f"  🏆 Competitions with active teams: {active_competitions:,}")
@@ -150,18 +149,14 @@ def generate_report():
     print(f"\n✅ DATA QUALITY METRICS")
     
     # Teams without countries
-    cursor.execute("SELECT COUNT(*) FROM teams WHERE country_id IS NULL")
-    teams_without_countries = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM teams")
-    total_teams = cursor.fetchone()[0]
+    teams_without_countries = metrics.get('teams', {}).get('without_country', 0)
+    total_teams = counts.get('teams', 0)
     
     coverage = (total_teams - teams_without_countries) / total_teams * 100
     print(f"  🌍 Teams with country data: {total_teams - teams_without_countries:,}/{total_teams:,} ({coverage:.1f}%)")
     
     # Competitions with popularity
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE popularity_rank IS NOT NULL")
-    comps_with_popularity = cursor.fetchone()[0]
+    comps_with_popularity = comp_metrics.get('with_popularity', 0)
     popularity_coverage = comps_with_popularity / total_comps * 100
     print(f"  ⭐ Competitions with popularity: {comps_with_popularity}/{total_comps} ({popularity_coverage:.1f}%)")
     
@@ -170,8 +165,7 @@ def generate_report():
     print(f"🚀 Database ready for use!")
     print(f"📈 Use teams_master.json for frontend integration")
     print(f"🔄 Next update: Tomorrow at 06:00 UTC")
-    
-    conn.close()
 
 if __name__ == "__main__":
-    generate_report()
+    with profile_run("generate_report"):
+        generate_report()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Streaming Ingest Pipeline
+A pool of fetch worker threads feeds a bounded queue drained by one
+dedicated SQLite writer thread. The bounded queue applies backpressure,
+so fetched-but-unwritten payloads never pile up in memory
+"""
+
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+from standings_fetcher import DEFAULT_CONCURRENCY, DEFAULT_MAX_RPS
+
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+
+_DONE = object()
+
+class HostThrottle:
+    """Thread-safe per-host request spacing for the fetch workers"""
+
+    def __init__(self, max_rps):
+        self.interval = 1.0 / max_rps if max_rps and max_rps > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class StageStats:
+    """Item count and busy time for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+class IngestPipeline:
+    """Run fetch(job) on a worker pool and write(writer, job, result, error) on one thread.
+
+    ``jobs`` are tuples whose first item is the URL (used for throttling).
+    If fetch raises, write still receives the job with result None and the
+    exception as ``error`` so it can record the failure. write returns the
+    number of rows it staged, which the summary reports.
+    ``open_writer()`` is called on the writer thread so the SQLite connection
+    is owned by the thread that uses it; its return value is passed to every
+    ``write`` call and closed with ``close_writer`` when the queue drains.
+    """
+
+    def __init__(self, fetch, write, open_writer, close_writer=None, workers=DEFAULT_CONCURRENCY,
+                 max_rps=DEFAULT_MAX_RPS, queue_size=QUEUE_SIZE):
+        self.fetch = fetch
+        self.write = write
+        self.open_writer = open_writer
+        self.close_writer = close_writer
+        self.workers = max(1, workers)
+        self.throttle = HostThrottle(max_rps)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.fetch_stats = StageStats("fetch")
+        self.write_stats = StageStats("write")
+        self.rows_staged = 0
+        self.backpressure_seconds = 0.0
+        self.max_queue_depth = 0
+        self.errors = []
+        self._lock = threading.Lock()
+        self._elapsed = 0.0
+        self._writer_error = None
+
+    def _fetch_worker(self, jobs):
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                return
+            self.throttle.wait(job[0])
+            started = time.perf_counter()
+            result, error = None, None
+            try:
+                result = self.fetch(job)
+            except Exception as e:
+                with self._lock:
+                    self.errors.append((job, e))
+                error = e
+            self.fetch_stats.add(time.perf_counter() - started)
+
+            # Blocks while the writer is behind: this is the backpressure
+            waited = time.perf_counter()
+            self.results.put((job, result, error))
+            waited = time.perf_counter() - waited
+            with self._lock:
+                self.backpressure_seconds += waited
+                self.max_queue_depth = max(self.max_queue_depth, self.results.qsize())
+
+    def _writer_loop(self):
+        try:
+            writer = self.open_writer()
+        except Exception as e:
+            # Keep draining so fetch workers never block on a dead writer
+            self._writer_error = e
+            while self.results.get() is not _DONE:
+                pass
+            return
+        try:
+            while True:
+                item = self.results.get()
+                if item is _DONE:
+                    break
+                job, result, error = item
+                started = time.perf_counter()
+                try:
+                    rows = self.write(writer, job, result, error) or 0
+                except Exception as e:
+                    with self._lock:
+                        self.errors.append((job, e))
+                    rows = 0
+                self.rows_staged += rows
+                self.write_stats.add(time.perf_counter() - started)
+        finally:
+            if self.close_writer:
+                self.close_writer(writer)
+
+    def run(self, jobs):
+        """Process every job and block until the writer has drained the queue"""
+        started = time.perf_counter()
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+
+        writer_thread = threading.Thread(target=self._writer_loop, name="sqlite-writer")
+        writer_thread.start()
+        fetchers = [
+            threading.Thread(target=self._fetch_worker, args=(pending,), name=f"fetch-{i}", daemon=True)
+            for i in range(min(self.workers, max(1, pending.qsize())))
+        ]
+        for thread in fetchers:
+            thread.start()
+        for thread in fetchers:
+            thread.join()
+        self.results.put(_DONE)
+        writer_thread.join()
+        self._elapsed = time.perf_counter() - started
+        if self._writer_error:
+            raise self._writer_error
+        return self
+
+    def report(self):
+        """Print per-stage throughput"""
+        elapsed = self._elapsed or 1e-9
+        print(f"\n⚙️ PIPELINE SUMMARY ({self.workers} fetch workers, queue size {self.results.maxsize})")
+        print(f"   Wall time: {elapsed:.1f}s")
+        for stats in (self.fetch_stats, self.write_stats):
+            print(f"   {stats.name:>5}: {stats.items:,} items, {stats.items / elapsed:,.2f} items/sec overall, "
+                  f"{stats.busy_seconds:.1f}s busy")
+        print(f"   Rows staged: {self.rows_staged:,} ({self.rows_staged / elapsed:,.0f} rows/sec)")
+        print(f"   Queue: max depth {self.max_queue_depth}, fetchers blocked {self.backpressure_seconds:.1f}s on a full queue")
+        if self.errors:
+            print(f"   ⚠️ {len(self.errors)} jobs failed")
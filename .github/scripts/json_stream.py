@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON Arrays
+Yields the elements of selected top-level arrays of a JSON object while the
+body is still arriving, so a large payload never has to be held or parsed
+as one object tree. Each element is decoded on its own with the stdlib
+decoder; everything outside the selected arrays is skipped
+"""
+
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+_decoder = json.JSONDecoder()
+
+class _Buffer:
+    """Text decoded so far from an iterator of byte chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Append the next chunk; False once the input is exhausted"""
+        if self.eof:
+            return False
+        # Drop what has been consumed so the buffer only holds the current element
+        if self.pos > 65536:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self.chunks:
+            text = self.utf8.decode(chunk)
+            if text:
+                self.text += text
+                return True
+        self.text += self.utf8.decode(b"", final=True)
+        self.eof = True
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or '' at the end of input"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading more input until it is whole"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # A number cut off by the end of the buffer ("-2." or "1e") still decodes,
+            # so the value only counts as complete once a delimiter follows it
+            if not self.eof and (end == len(self.text) or self.text[end] not in _DELIMITERS):
+                self.more()
+                continue
+            self.pos = end
+            return value
+
+def _elements(buffer):
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.value()
+        separator = buffer.peek()
+        buffer.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"expected ',' or ']' in array, got {separator!r}")
+
+def iter_arrays(chunks, keys):
+    """Yield (key, element) for every element of the top-level arrays named in keys.
+
+    ``chunks`` is any iterable of bytes holding one JSON object. Arrays under
+    other keys are walked element by element and discarded; other values are
+    decoded and discarded.
+    """
+    keys = set(keys)
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        buffer.expect(":")
+        if buffer.peek() == "[":
+            for element in _elements(buffer):
+                if key in keys:
+                    yield key, element
+        else:
+            buffer.value()
+        separator = buffer.peek()
+        buffer.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"expected ',' or '}}' in object, got {separator!r}")
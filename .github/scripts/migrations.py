@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations
+Numbered, forward-only schema changes tracked in PRAGMA user_version. Each
+migration runs once per database in its own transaction, so databases that
+already exist pick up new indexes in place, without a rebuild
+Run query_plans.py after adding one to check the plans of the pipeline queries
+"""
+
+import argparse
+import sqlite3
+
+# (version, description, statements); append only, never edit a shipped migration
+MIGRATIONS = [
+    (1, 'baseline indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_teams_country ON teams(country_id)',
+        'CREATE INDEX IF NOT EXISTS idx_teams_competition ON teams(main_competition_id)',
+        'CREATE INDEX IF NOT EXISTS idx_competitions_country ON competitions(country_id)',
+        'CREATE INDEX IF NOT EXISTS idx_competitions_popularity ON competitions(popularity_rank)',
+        'CREATE INDEX IF NOT EXISTS idx_team_competitions_team ON team_competitions(team_id)',
+        'CREATE INDEX IF NOT EXISTS idx_team_competitions_comp ON team_competitions(competition_id)',
+        'CREATE INDEX IF NOT EXISTS idx_seasons_competition ON seasons(competition_id)',
+    ]),
+    (2, 'partial and covering indexes for the pipeline queries', [
+        # Refresh candidates, coverage and progress seeding: only competitions with standings.
+        # has_standings is repeated as a column because SQLite does not treat the
+        # partial index's own WHERE column as covered
+        '''CREATE INDEX IF NOT EXISTS idx_competitions_standings
+           ON competitions(popularity_rank, name, has_standings) WHERE has_standings = 1''',
+        # Aggregate rebuilds and report fallbacks: active links per team and per competition
+        '''CREATE INDEX IF NOT EXISTS idx_team_competitions_active_team
+           ON team_competitions(team_id, is_active) WHERE is_active = 1''',
+        '''CREATE INDEX IF NOT EXISTS idx_team_competitions_active_comp
+           ON team_competitions(competition_id, team_id, is_active) WHERE is_active = 1''',
+        # A resumed population only reads the competitions that are not done yet
+        '''CREATE INDEX IF NOT EXISTS idx_population_progress_open
+           ON population_progress(attempts) WHERE status != 'done' ''',
+        # Changeset builds read the changed ids per table, already sorted
+        'CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log(table_name, row_id)',
+        'CREATE INDEX IF NOT EXISTS idx_update_log_timestamp ON update_log(timestamp)',
+        # A prefix of UNIQUE(team_id, competition_id, season_num), so it only cost writes
+        'DROP INDEX IF EXISTS idx_team_competitions_team',
+    ]),
+    (3, 'standings history and seasons backfill', [
+        # One row per change (see standings_history.py); valid_from is days since 1970-01-01
+        '''CREATE TABLE IF NOT EXISTS standings_history (
+            competition_id INTEGER NOT NULL,
+            season_num INTEGER NOT NULL,
+            team_id INTEGER NOT NULL,
+            valid_from INTEGER NOT NULL,
+            position INTEGER,
+            points INTEGER,
+            PRIMARY KEY (competition_id, season_num, team_id, valid_from)
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_standings_history_team ON standings_history(team_id, season_num, valid_from)',
+        # seasons was never written before; derive it from competitions.current_season_num
+        '''INSERT INTO seasons (competition_id, season_num, is_current)
+           SELECT id, current_season_num, 1 FROM competitions WHERE current_season_num IS NOT NULL
+           ON CONFLICT (competition_id, season_num) DO NOTHING''',
+    ]),
+    (4, 'standings fingerprint for the refresh scheduler', [
+        # Positions and points, the scheduler's activity signal (see refresh_scheduler.py)
+        'ALTER TABLE refresh_schedule ADD COLUMN standings_fingerprint TEXT',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply every migration newer than the database's user_version; returns the versions applied.
+
+    Needs the tables created by create_schema.py. A database from newer code
+    is left as it is.
+    """
+    current = schema_version(conn)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        # Settle anything the caller left open so the migration is its own transaction
+        conn.commit()
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        print(f"🧱 Schema migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    # Imported here: create_schema imports this module
+    from create_schema import resolve_db_path
+    
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="only print the current and latest version")
+    args = parser.parse_args()
+    conn = sqlite3.connect(resolve_db_path())
+    print(f"🧱 Schema version {schema_version(conn)}, latest {SCHEMA_VERSION}")
+    if not args.status:
+        migrate(conn)
+    conn.close()
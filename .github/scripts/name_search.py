@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Team and Competition Name Search
+Prefix and token search over the FTS5 indexes created by create_schema.
+Matching ignores case and diacritics; teams are ranked by the popularity of
+their main competition, competitions by their own popularity_rank
+"""
+
+import argparse
+import re
+import sqlite3
+
+from create_schema import resolve_db_path
+
+DEFAULT_LIMIT = 10
+
+# 365Scores popularityRank grows with popularity (LaLiga ~94M, reserve cups ~5k)
+TEAM_SEARCH_SQL = '''
+    SELECT t.id AS team_id, t.name AS team_name, co.name AS country_name,
+           t.main_competition_id, c.name AS main_competition_name
+    FROM team_search s
+    JOIN teams t ON t.id = s.rowid
+    LEFT JOIN competitions c ON c.id = t.main_competition_id
+    LEFT JOIN countries co ON co.id = t.country_id
+    WHERE team_search MATCH ?
+    ORDER BY c.popularity_rank IS NULL, c.popularity_rank DESC, s.rank
+    LIMIT ?
+'''
+
+COMPETITION_SEARCH_SQL = '''
+    SELECT c.id AS competition_id, c.name AS competition_name, c.long_name,
+           co.name AS country_name, c.popularity_rank
+    FROM competition_search s
+    JOIN competitions c ON c.id = s.rowid
+    LEFT JOIN countries co ON co.id = c.country_id
+    WHERE competition_search MATCH ?
+    ORDER BY c.popularity_rank IS NULL, c.popularity_rank DESC, s.rank
+    LIMIT ?
+'''
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    "birm city" -> '"birm"* AND "city"*'. Quoting each word keeps FTS5
+    operators and punctuation in user input from being interpreted.
+    """
+    words = re.findall(r"\w+", query)
+    return " AND ".join(f'"{word}"*' for word in words)
+
+def _search(conn, sql, query, limit):
+    expression = match_expression(query)
+    if not expression:
+        return []
+    cursor = conn.execute(sql, (expression, limit))
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def search_teams(conn, query, limit=DEFAULT_LIMIT):
+    """Teams whose name matches every word of query as a prefix"""
+    return _search(conn, TEAM_SEARCH_SQL, query, limit)
+
+def search_competitions(conn, query, limit=DEFAULT_LIMIT):
+    """Competitions whose name or long name matches every word of query"""
+    return _search(conn, COMPETITION_SEARCH_SQL, query, limit)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search teams and competitions by name")
+    parser.add_argument("query")
+    parser.add_argument("--competitions", action="store_true", help="search competitions instead of teams")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(resolve_db_path())
+    if args.competitions:
+        for comp in search_competitions(conn, args.query, args.limit):
+            print(f"  {comp['competition_id']:>6}  {comp['competition_name']} ({comp['country_name'] or '-'})")
+    else:
+        for team in search_teams(conn, args.query, args.limit):
+            print(f"  {team['team_id']:>6}  {team['team_name']} ({team['country_name'] or '-'})")
+    conn.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Pipeline Profiling
+Opt-in profiling for the pipeline scripts, enabled with --profile or
+PROFILE=1. One run writes four files to PROFILE_DIR (default: profiles/):
+  <script>-<time>.prof       cProfile of every thread, for snakeviz
+  <script>-<time>.collapsed  sampled wall-clock stacks, for flamegraph.pl/speedscope
+  <script>-<time>.memory.txt tracemalloc top allocations and peak
+  <script>-<time>.sql.tsv    per-statement SQLite time, calls and rows
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+TOP_ALLOCATIONS = 30
+SQL_TEXT_LIMIT = 500
+
+def profiling_requested(argv=None):
+    """True if --profile was passed (it is removed from argv) or PROFILE=1 is set"""
+    argv = sys.argv if argv is None else argv
+    requested = "--profile" in argv
+    while "--profile" in argv:
+        argv.remove("--profile")
+    return requested or os.getenv("PROFILE", "0").lower() in ("1", "true", "yes")
+
+def resolve_profile_dir():
+    configured = os.getenv("PROFILE_DIR")
+    if configured:
+        return configured
+    workspace = os.getenv("GITHUB_WORKSPACE")
+    if workspace:
+        return os.path.join(workspace, "profiles")
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "profiles"))
+
+class StatementTrace:
+    """Time, calls and rows per SQL text, filled in by traced connections"""
+
+    def __init__(self):
+        self.statements = {}
+        self._lock = threading.Lock()
+
+    def add(self, sql, seconds, rows=1):
+        key = " ".join(sql.split())[:SQL_TEXT_LIMIT]
+        with self._lock:
+            entry = self.statements.setdefault(key, [0.0, 0, 0, 0.0])
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += rows
+            entry[3] = max(entry[3], seconds)
+
+    def timed(self, sql, call, rows=1):
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self.add(sql, time.perf_counter() - started, rows)
+
+_trace = None
+
+class _TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return _trace.timed(sql, lambda: super(_TracedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        rows = seq_of_parameters if isinstance(seq_of_parameters, (list, tuple)) else list(seq_of_parameters)
+        return _trace.timed(sql, lambda: super(_TracedCursor, self).executemany(sql, rows), len(rows))
+
+    def executescript(self, script):
+        return _trace.timed(script, lambda: super(_TracedCursor, self).executescript(script))
+
+class _TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=None):
+        return super().cursor(factory or _TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        return _trace.timed("COMMIT", super().commit)
+
+class RunProfiler:
+    """cProfile, stack sampler, tracemalloc and SQL trace for one script run"""
+
+    def __init__(self, name, out_dir=None, sample_interval=SAMPLE_INTERVAL):
+        # Imported here so scripts that are not profiled don't pay for them at startup
+        import cProfile
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self.out_dir = out_dir or resolve_profile_dir()
+        self.base = os.path.join(self.out_dir, f"{name}-{stamp}")
+        self.sample_interval = sample_interval
+        self.profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.samples = Counter()
+        self.trace = StatementTrace()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._connect = None
+        self._lock = threading.Lock()
+
+    def _thread_hook(self, frame, event, arg):
+        """Runs once in every new thread and hands it its own cProfile"""
+        import cProfile
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows only one active profiler per process
+            return
+        with self._lock:
+            self.thread_profiles.append(profile)
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                thread = names.get(ident, str(ident)).replace(";", ":")
+                self.samples[";".join([thread] + stack[::-1])] += 1
+
+    def _traced_connect(self, *args, **kwargs):
+        kwargs.setdefault("factory", _TracedConnection)
+        return self._connect(*args, **kwargs)
+
+    def start(self):
+        import tracemalloc
+        global _trace
+        os.makedirs(self.out_dir, exist_ok=True)
+        _trace = self.trace
+        self._connect = sqlite3.connect
+        sqlite3.connect = self._traced_connect
+        tracemalloc.start()
+        # The sampler starts before the hook so it is not profiled itself
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        threading.setprofile(self._thread_hook)
+        self.profile.enable()
+        return self
+
+    def stop(self):
+        import tracemalloc
+        self.profile.disable()
+        threading.setprofile(None)
+        self._stop.set()
+        self._sampler.join()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sqlite3.connect = self._connect
+
+    def write(self):
+        """Write the four artifacts and print a short summary"""
+        import pstats
+        stats = pstats.Stats(self.profile)
+        for profile in self.thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(self.base + ".prof")
+
+        with open(self.base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        current, peak = self.memory
+        top = self.snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        with open(self.base + ".memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"current {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB\n\n")
+            for stat in top:
+                f.write(f"{stat}\n")
+
+        statements = sorted(self.trace.statements.items(), key=lambda item: -item[1][0])
+        with open(self.base + ".sql.tsv", "w", encoding="utf-8") as f:
+            f.write("total_ms\tcalls\trows\tmean_ms\tmax_ms\tsql\n")
+            for sql, (seconds, calls, rows, longest) in statements:
+                f.write(f"{seconds * 1000:.3f}\t{calls}\t{rows}\t{seconds * 1000 / calls:.3f}\t{longest * 1000:.3f}\t{sql}\n")
+
+        # stderr, so reports redirected to a file stay unchanged
+        out = sys.stderr
+        print(f"\n🔬 PROFILE ({len(self.thread_profiles) + 1} threads profiled, {sum(self.samples.values()):,} stack samples)", file=out)
+        print(f"   Memory: peak {peak / 1024 / 1024:.1f} MB traced", file=out)
+        for stat in top[:3]:
+            print(f"   {stat}", file=out)
+        for sql, (seconds, calls, rows, _) in statements[:5]:
+            print(f"   SQL {seconds:7.3f}s {calls:6,} calls {rows:8,} rows  {sql[:70]}", file=out)
+        print(f"   Written to {self.base}.(prof|collapsed|memory.txt|sql.tsv)", file=out)
+
+@contextmanager
+def profile_run(name):
+    """Profile the enclosed block when profiling was requested, otherwise do nothing"""
+    if not profiling_requested():
+        yield None
+        return
+    profiler = RunProfiler(name).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.write()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Query Plan Checks
+Runs EXPLAIN QUERY PLAN for the pipeline's queries and for every statement
+inside the schema's triggers, against a freshly created and migrated
+in-memory database (or --db), and fails when one of them scans a whole
+table. Queries that read a whole table by design list it as an allowed scan
+"""
+
+import argparse
+import io
+import re
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+
+from changesets import CHANGED_ROWS_SQL
+from create_schema import create_database_schema, AGGREGATES_SQL
+from db_aggregates import VALUE_SQL, TOP_KEYS_SQL
+from db_metrics import TOP_COMPETITIONS_SQL, RECENT_UPDATES_SQL
+from db_writer import TEAM_UPSERT, TEAM_COMPETITION_UPSERT, TEAM_COMPETITION_NO_SEASON_SQL, MAIN_COMPETITION_SQL
+from export_teams_master import TEAM_ROWS_SQL, COMPETITION_TEAMS_SQL
+from full_database_population import (COUNTRY_UPSERT, COMPETITION_UPSERT, RESUMABLE_WORK_SQL,
+                                      SEED_PROGRESS_SQL, PROGRESS_SUMMARY_SQL)
+from name_search import TEAM_SEARCH_SQL, COMPETITION_SEARCH_SQL
+from refresh_scheduler import SCHEDULE_UPSERT, SCHEDULE_SQL, CANDIDATES_SQL, COVERAGE_SQL
+from read_api import COMPETITION_TEAMS_WHERE, COUNTRY_TEAMS_WHERE, LATEST_UPDATE_SQL
+from run_metrics import RECENT_RUNS_SQL
+from sharded_ingest import MERGE_LINKS_NO_SEASON_SQL, create_shard_tables
+from standings_history import HISTORY_SQL, SEASON_ON_SQL, TABLE_ON_SQL, TEAM_TRAJECTORY_SQL, SEASONS_SYNC_SQL
+from update_current_season import SEED_COMPETITION_UPSERT, FINGERPRINT_UPSERT, SEASON_UPDATE_SQL
+
+UPSERTS = [TEAM_UPSERT, TEAM_COMPETITION_UPSERT, COUNTRY_UPSERT, COMPETITION_UPSERT,
+           SEED_COMPETITION_UPSERT, FINGERPRINT_UPSERT, SCHEDULE_UPSERT]
+
+# (name, sql, tables or aliases that may be scanned in full)
+QUERIES = [
+    ('refresh candidates', CANDIDATES_SQL, ()),
+    ('refresh coverage', COVERAGE_SQL, ()),
+    ('refresh schedule', SCHEDULE_SQL, ('refresh_schedule',)),
+    ('season update', SEASON_UPDATE_SQL, ()),
+    ('link without season', TEAM_COMPETITION_NO_SEASON_SQL, ()),
+    # Every run, over the active links; "ranked" is the materialized window subquery
+    ('main competitions', MAIN_COMPETITION_SQL, ('ranked',)),
+    # Reads every merged shard link once and probes team_competitions for each
+    ('shard links without season', MERGE_LINKS_NO_SEASON_SQL, ('m',)),
+    ('resumable work', RESUMABLE_WORK_SQL, ()),
+    ('seed progress', SEED_PROGRESS_SQL, ()),
+    ('progress summary', PROGRESS_SUMMARY_SQL, ('population_progress',)),
+    ('aggregate value', VALUE_SQL, ()),
+    ('aggregate top keys', TOP_KEYS_SQL, ()),
+    # Full recomputation, only run to backfill or check the aggregates
+    ('aggregates rebuild', AGGREGATES_SQL, ('competitions', 'teams', 'team_competitions')),
+    ('top competitions', TOP_COMPETITIONS_SQL, ()),
+    ('recent updates', RECENT_UPDATES_SQL.format(skipped='competitions_skipped'), ()),
+    ('recent runs', RECENT_RUNS_SQL, ()),
+    ('changed rows', CHANGED_ROWS_SQL, ()),
+    ('export all teams', TEAM_ROWS_SQL.format(where=''), ('t',)),
+    ('export dirty teams', TEAM_ROWS_SQL.format(where='WHERE t.id IN (SELECT team_id FROM export_dirty)'), ('export_dirty',)),
+    ('export one team', TEAM_ROWS_SQL.format(where='WHERE t.id = ?'), ()),
+    ('export competition teams', COMPETITION_TEAMS_SQL, ()),
+    ('api competition teams', TEAM_ROWS_SQL.format(where=COMPETITION_TEAMS_WHERE), ()),
+    ('api country teams', TEAM_ROWS_SQL.format(where=COUNTRY_TEAMS_WHERE), ()),
+    ('api latest update', LATEST_UPDATE_SQL, ()),
+    ('team search', TEAM_SEARCH_SQL, ()),
+    ('competition search', COMPETITION_SEARCH_SQL, ()),
+    ('standings history', HISTORY_SQL, ()),
+    ('history season on day', SEASON_ON_SQL, ()),
+    ('table on day', TABLE_ON_SQL, ()),
+    ('team trajectory', TEAM_TRAJECTORY_SQL.format(filters=''), ()),
+    ('team season trajectory', TEAM_TRAJECTORY_SQL.format(filters='AND season_num = ?'), ()),
+    # Once per run, over every competition and season
+    ('seasons sync', SEASONS_SYNC_SQL[0], ('competitions',)),
+    ('seasons retire', SEASONS_SYNC_SQL[1], ('seasons',)),
+] + [
+    query
+    for upsert in UPSERTS
+    for query in [
+        (f'{upsert.table} upsert', upsert.sql, ()),
+        (f'{upsert.table} existing keys', upsert.lookup_sql(3), ()),
+    ]
+]
+
+# Subqueries and co-routines show up as "SCAN (subquery-1)" and are not tables
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TRIGGER_ROW = re.compile(r'\b(NEW|OLD)\.\w+')
+PARAMETER = re.compile(r'\?(\d*)')
+
+def trigger_statements(conn):
+    """(name, sql) for each statement in each trigger body, with NEW./OLD. columns as parameters"""
+    statements = []
+    for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name"):
+        body = sql[re.search(r'\bBEGIN\b', sql).end():sql.rstrip().rfind('END')]
+        for index, statement in enumerate(s for s in body.split(';') if s.strip()):
+            statements.append((f'trigger {name} #{index + 1}', TRIGGER_ROW.sub('?', statement)))
+    return statements
+
+def query_plan(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines; every parameter is bound to NULL"""
+    numbers = PARAMETER.findall(sql)
+    count = max(map(int, numbers)) if all(numbers) and numbers else len(numbers)
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', [None] * count)]
+
+def check_plans(conn):
+    """Return (name, plan, unexpected full scans) for every query"""
+    queries = QUERIES + [(name, sql, ()) for name, sql in trigger_statements(conn)]
+    results = []
+    for name, sql, allowed in queries:
+        plan = query_plan(conn, sql)
+        scans = [m.group(1) for m in map(FULL_SCAN.match, plan) if m and m.group(1) not in allowed]
+        results.append((name, plan, scans))
+    return results
+
+def fresh_schema():
+    conn = sqlite3.connect(':memory:')
+    with redirect_stdout(io.StringIO()):
+        create_database_schema(conn)
+    create_shard_tables(conn, 'temp')
+    return conn
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when a pipeline query plans a full table scan")
+    parser.add_argument("--db", help="check this database instead of a fresh in-memory schema")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    if args.db:
+        conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        # The shard merge tables only exist in temp while a merge runs
+        create_shard_tables(conn, 'temp')
+    else:
+        conn = fresh_schema()
+    results = check_plans(conn)
+    conn.close()
+
+    failures = [result for result in results if result[2]]
+    for name, plan, scans in results:
+        if scans or args.verbose:
+            print(f"{'❌' if scans else '✅'} {name}" + (f": full scan of {', '.join(scans)}" if scans else ""))
+            for detail in plan:
+                print(f"     {detail}")
+    print(f"🔎 {len(results)} query plans checked, {len(failures)} with a full table scan")
+    sys.exit(1 if failures else 0)
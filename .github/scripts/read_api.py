@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Read API Server
+Small asyncio HTTP service that answers team lookups straight from
+soccer_data_colab.db, so the frontend no longer has to download
+teams_master.json whole. Queries run on a pool of read-only connections to
+the database in WAL mode, and responses are kept in an LRU cache that is
+dropped as soon as a new update_log row appears
+  GET /teams/{id}  /competitions/{id}/teams  /countries/{id}/teams  /status
+Team entries have the same shape as in teams_master.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from create_schema import resolve_db_path
+from db_writer import finalize
+from export_teams_master import iter_team_entries
+
+POOL_SIZE = int(os.getenv("READ_API_POOL_SIZE", "4"))
+CACHE_SIZE = int(os.getenv("READ_API_CACHE_SIZE", "2048"))
+POLL_SECONDS = float(os.getenv("READ_API_POLL_SECONDS", "1"))
+
+COMPETITION_TEAMS_WHERE = 'WHERE t.id IN (SELECT team_id FROM team_competitions WHERE competition_id = ?)'
+COUNTRY_TEAMS_WHERE = 'WHERE t.country_id = ?'
+LATEST_UPDATE_SQL = 'SELECT MAX(id) FROM update_log'
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def team(conn, team_id):
+    found = next(iter_team_entries(conn, 'WHERE t.id = ?', (team_id,)), None)
+    if found is None:
+        return 404, {'error': f'team {team_id} not found'}
+    return 200, found[1]
+
+def competition_teams(conn, comp_id):
+    if not conn.execute('SELECT 1 FROM competitions WHERE id = ?', (comp_id,)).fetchone():
+        return 404, {'error': f'competition {comp_id} not found'}
+    return 200, [entry for _, entry in iter_team_entries(conn, COMPETITION_TEAMS_WHERE, (comp_id,))]
+
+def country_teams(conn, country_id):
+    if not conn.execute('SELECT 1 FROM countries WHERE id = ?', (country_id,)).fetchone():
+        return 404, {'error': f'country {country_id} not found'}
+    return 200, [entry for _, entry in iter_team_entries(conn, COUNTRY_TEAMS_WHERE, (country_id,))]
+
+def latest_update(conn):
+    try:
+        return conn.execute(LATEST_UPDATE_SQL).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+ROUTES = [
+    (re.compile(r'^/teams/(\d+)$'), team),
+    (re.compile(r'^/competitions/(\d+)/teams$'), competition_teams),
+    (re.compile(r'^/countries/(\d+)/teams$'), country_teams),
+]
+
+def encode(status, payload):
+    """(status, body, etag) for a JSON payload; only 200s carry an ETag"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16] if status == 200 else None
+    return status, body, etag
+
+def render(status, body, etag=None, keep_alive=True):
+    head = [
+        f'HTTP/1.1 {status} {STATUS_TEXT[status]}',
+        'Content-Type: application/json; charset=utf-8',
+        f'Content-Length: {len(body)}',
+        'Access-Control-Allow-Origin: *',
+        f'Connection: {"keep-alive" if keep_alive else "close"}',
+    ]
+    if etag:
+        head += [f'ETag: {etag}', 'Cache-Control: no-cache']
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+def enable_wal(db_path):
+    """Switch the database to WAL so readers and the update scripts don't block each other.
+
+    Returns the journal mode it had before.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        previous = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        conn.execute('PRAGMA journal_mode=WAL')
+        return previous
+    finally:
+        conn.close()
+
+class ConnectionPool:
+    """Fixed set of read-only connections, handed out one per query"""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.size = size
+        self._conns = [
+            sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+            for _ in range(size)
+        ]
+        self._idle = queue.SimpleQueue()
+        for conn in self._conns:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+
+class ResponseCache:
+    """LRU of encoded responses, valid for one update_log generation.
+
+    Only used from the event loop thread, so it needs no lock.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        response = self._entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key, response, generation):
+        # A response computed before the last invalidation may hold older rows
+        if generation != self.generation or self.max_entries <= 0:
+            return
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set_generation(self, generation):
+        """Drop every entry when update_log has moved on; returns True if it had"""
+        if generation == self.generation:
+            return False
+        if self.generation is not None:
+            self.invalidations += 1
+        self.generation = generation
+        self._entries.clear()
+        return True
+
+    def stats(self):
+        return {
+            'entries': len(self._entries), 'max_entries': self.max_entries,
+            'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations,
+        }
+
+class ReadApiServer:
+    def __init__(self, db_path=None, pool_size=POOL_SIZE, cache_size=CACHE_SIZE, poll_seconds=POLL_SECONDS):
+        self.db_path = db_path or resolve_db_path()
+        self.previous_journal_mode = enable_wal(self.db_path)
+        self.pool = ConnectionPool(self.db_path, pool_size)
+        # One thread per connection, so a query never waits for the pool
+        self.executor = ThreadPoolExecutor(pool_size, thread_name_prefix='read-api')
+        self.cache = ResponseCache(cache_size)
+        self.poll_seconds = poll_seconds
+        self.requests = 0
+        self.started = time.monotonic()
+
+    async def query(self, func, *args):
+        def call():
+            with self.pool.connection() as conn:
+                return func(conn, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def watch_updates(self):
+        """Poll update_log and drop the cache when a new row appears"""
+        while True:
+            generation = await self.query(latest_update)
+            if self.cache.set_generation(generation) and self.cache.invalidations:
+                print(f"🔄 update_log #{generation}: response cache cleared")
+            await asyncio.sleep(self.poll_seconds)
+
+    def status(self):
+        return {
+            'update_log_id': self.cache.generation,
+            'pool_size': self.pool.size, 'requests': self.requests,
+            'uptime_seconds': round(time.monotonic() - self.started, 1), 'cache': self.cache.stats(),
+        }
+
+    async def respond(self, path):
+        """(status, body, etag) for a GET of path"""
+        if path == '/status':
+            return encode(200, self.status())
+        response = self.cache.get(path)
+        if response is not None:
+            return response
+        for pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match:
+                generation = self.cache.generation
+                response = encode(*await self.query(handler, int(match.group(1))))
+                self.cache.put(path, response, generation)
+                return response
+        return encode(404, {'error': f'no route for {path}'})
+
+    async def handle(self, reader, writer):
+        """Serve one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    writer.write(render(*encode(400, {'error': 'bad request line'}), keep_alive=False))
+                    break
+                method, target, version = parts
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if method == 'GET':
+                    status, body, etag = await self.respond(target.split('?', 1)[0])
+                else:
+                    status, body, etag = encode(405, {'error': 'only GET is supported'})
+                if etag and headers.get('if-none-match') == etag:
+                    status, body = 304, b''
+                self.requests += 1
+                writer.write(render(status, body, etag, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8780):
+        server = await asyncio.start_server(self.handle, host, port, backlog=512)
+        watcher = asyncio.create_task(self.watch_updates())
+        print(f"📡 Serving {self.db_path} on http://{host}:{server.sockets[0].getsockname()[1]} "
+              f"({self.pool.size} read-only WAL connections, cache {self.cache.max_entries} entries)",
+              flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+        # Hand the file back as it is shipped, a single file without a -wal
+        if self.previous_journal_mode != 'wal':
+            finalize(sqlite3.connect(self.db_path))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve team lookups from the database over HTTP")
+    parser.add_argument("--db", help="database path (default: the pipeline's database)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--pool", type=int, default=POOL_SIZE, help="read-only connections")
+    parser.add_argument("--cache", type=int, default=CACHE_SIZE, help="cached responses; 0 disables the cache")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between update_log checks")
+    args = parser.parse_args()
+
+    api = ReadApiServer(args.db, args.pool, args.cache, args.poll)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
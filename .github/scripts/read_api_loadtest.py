@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Read API Load Test
+Drives read_api.py with concurrent keep-alive clients over a mix of team,
+competition and country lookups drawn from the database, and reports
+requests/sec and p50/p90/p99 latency. Starts its own server on a free port
+unless --url points at a running one
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from create_schema import resolve_db_path
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (share of requests, path template, ids to draw from)
+MIX = [
+    (0.7, '/teams/{}', 'SELECT id FROM teams'),
+    (0.2, '/competitions/{}/teams', 'SELECT DISTINCT competition_id FROM team_competitions'),
+    (0.1, '/countries/{}/teams', 'SELECT DISTINCT country_id FROM teams WHERE country_id IS NOT NULL'),
+]
+
+def sample_paths(db_path, keys, seed=1):
+    """Up to keys distinct paths, split across MIX"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    paths = []
+    for share, template, sql in MIX:
+        ids = [row[0] for row in conn.execute(sql)]
+        paths += [template.format(i) for i in rng.sample(ids, min(len(ids), max(1, int(keys * share))))]
+    conn.close()
+    return paths
+
+async def fetch(reader, writer, host, path):
+    """GET path on an open keep-alive connection; returns (status, body bytes)"""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def client(host, port, paths, deadline, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status, _ = await fetch(reader, writer, host, rng.choice(paths))
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return json.loads((await fetch(reader, writer, host, path))[1])
+    finally:
+        writer.close()
+
+async def load_test(host, port, paths, clients, duration, warmup, seed=1):
+    if warmup:
+        await asyncio.gather(*(client(host, port, paths, time.perf_counter() + warmup, [], {}, random.Random(seed + i))
+                               for i in range(clients)))
+    before = await get_json(host, port, '/status')
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, paths, started + duration, latencies, statuses, random.Random(seed + i))
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    after = await get_json(host, port, '/status')
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000, 2) if latencies else None
+    hits = after['cache']['hits'] - before['cache']['hits']
+    misses = after['cache']['misses'] - before['cache']['misses']
+    return {
+        'clients': clients, 'duration_s': round(elapsed, 2), 'paths': len(paths),
+        'requests': len(latencies), 'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(50), 'p90_ms': percentile(90), 'p99_ms': percentile(99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'cache_hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(db_path, port, extra_args):
+    """Run read_api.py as a child process and wait until it answers"""
+    process = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, 'read_api.py'), '--db', db_path,
+                                '--port', str(port)] + extra_args, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"read_api.py exited with status {process.returncode}")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("read_api.py did not start within 10s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the read API")
+    parser.add_argument("--url", help="a running server, e.g. http://127.0.0.1:8780 (default: start one)")
+    parser.add_argument("--db", help="database to sample ids from (and to serve)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of unmeasured load first")
+    parser.add_argument("--keys", type=int, default=500, help="distinct paths requested")
+    parser.add_argument("--cache", type=int, help="cache size for the started server (0 disables it)")
+    parser.add_argument("--pool", type=int, help="read connections for the started server")
+    parser.add_argument("--out", help="also write the result as JSON")
+    args = parser.parse_args()
+
+    db_path = args.db or resolve_db_path()
+    paths = sample_paths(db_path, args.keys)
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        extra = (['--cache', str(args.cache)] if args.cache is not None else []) + \
+                (['--pool', str(args.pool)] if args.pool is not None else [])
+        server = start_server(db_path, port, extra)
+
+    print(f"🚀 READ API LOAD TEST http://{host}:{port} - {args.clients} clients, {args.duration:g}s, {len(paths)} paths")
+    try:
+        result = asyncio.run(load_test(host, port, paths, args.clients, args.duration, args.warmup))
+    finally:
+        if server:
+            # SIGINT lets the server shut down cleanly and restore the journal mode
+            server.send_signal(signal.SIGTERM if os.name == 'nt' else signal.SIGINT)
+            server.wait()
+
+    print(f"  Requests: {result['requests']:,} ({', '.join(f'{s}: {n:,}' for s, n in result['statuses'].items())})")
+    print(f"  Throughput: {result['requests_per_sec']:,.1f} req/s")
+    print(f"  Latency: p50 {result['p50_ms']} ms, p90 {result['p90_ms']} ms, p99 {result['p99_ms']} ms, max {result['max_ms']} ms")
+    if result['cache_hit_ratio'] is not None:
+        print(f"  Cache hit ratio: {result['cache_hit_ratio']:.1%}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"  💾 Saved {args.out}")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Adaptive Refresh Scheduler
+Decides which competitions the daily update fetches. Each competition's
+last fetch time, observed change rate and in-season flag are kept in
+refresh_schedule; every run fills its request budget with the
+competitions whose stored data is most likely to be stale
+Activity is measured on the standings (positions and points), which move
+every matchday, rather than on rosters, which rarely change mid-season
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from db_writer import Upsert
+
+REFRESH_BUDGET = int(os.getenv("REFRESH_BUDGET", "100"))
+
+# Change rate is an exponentially weighted average of "did the standings change?"
+CHANGE_RATE_ALPHA = 0.3
+INITIAL_CHANGE_RATE = 0.5
+MIN_CHANGE_RATE = 0.02
+
+MIN_INTERVAL = timedelta(hours=12)
+MAX_INTERVAL = timedelta(days=14)
+OFF_SEASON_INTERVAL = timedelta(days=7)
+# A competition whose standings have not moved for this long is treated as off-season
+IN_SEASON_WINDOW = timedelta(days=21)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEDULE_UPSERT = Upsert('refresh_schedule', [
+    'competition_id', 'last_fetched_at', 'last_changed_at', 'fetch_count', 'change_count',
+    'change_rate', 'in_season', 'next_due_at', 'standings_fingerprint'
+], key=['competition_id'])
+
+SCHEDULE_SQL = '''
+    SELECT competition_id, last_fetched_at, last_changed_at, fetch_count, change_count,
+           change_rate, in_season, next_due_at, standings_fingerprint
+    FROM refresh_schedule
+'''
+
+CANDIDATES_SQL = '''
+    SELECT id, name, has_standings, popularity_rank
+    FROM competitions
+    WHERE has_standings = 1
+'''
+
+COVERAGE_SQL = '''
+    SELECT
+        SUM(CASE WHEN s.competition_id IS NULL THEN 1 ELSE 0 END),
+        SUM(CASE WHEN s.next_due_at <= ? THEN 1 ELSE 0 END),
+        SUM(CASE WHEN s.next_due_at > ? THEN 1 ELSE 0 END)
+    FROM competitions c
+    LEFT JOIN refresh_schedule s ON s.competition_id = c.id
+    WHERE c.has_standings = 1
+'''
+
+def _parse(value):
+    return datetime.strptime(value, TIME_FORMAT) if value else None
+
+def standings_fingerprint(teams_data, season_num=None):
+    """Stable hash of a competition's table: each team's position and points"""
+    table = [season_num] + sorted(
+        (t['team_id'], t.get('position'), t.get('points')) for t in teams_data
+    )
+    return hashlib.sha256(json.dumps(table, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def next_interval(change_rate, in_season):
+    """Expected time until the standings change again, clamped to sane bounds"""
+    interval = timedelta(days=1) / max(change_rate, MIN_CHANGE_RATE)
+    if not in_season:
+        interval = max(interval, OFF_SEASON_INTERVAL)
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+def staleness(state, now):
+    """Probability that the stored standings have changed since the last fetch"""
+    if not state or not state['last_fetched_at']:
+        return 1.0
+    days = (now - _parse(state['last_fetched_at'])).total_seconds() / 86400
+    rate = state['change_rate'] if state['in_season'] else state['change_rate'] / 4
+    return 1.0 - (1.0 - min(rate, 0.999)) ** max(days, 0.0)
+
+def load_schedule(conn):
+    """Map competition_id -> schedule state dict"""
+    cursor = conn.execute(SCHEDULE_SQL)
+    columns = [d[0] for d in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor}
+
+def select_due_competitions(conn, budget=REFRESH_BUDGET, now=None):
+    """Pick up to `budget` competitions with standings, most likely stale first.
+
+    Overdue competitions come before ones that are not yet due; within each
+    group the higher staleness probability wins, then popularity (365Scores
+    popularityRank grows with popularity, so the highest rank goes first).
+    Returns (id, name, has_standings, popularity_rank) rows and the loaded
+    schedule so results can be recorded without another query.
+    """
+    now = now or datetime.utcnow()
+    schedule = load_schedule(conn)
+    candidates = conn.execute(CANDIDATES_SQL).fetchall()
+
+    def priority(comp):
+        state = schedule.get(comp[0])
+        due = not state or not state['next_due_at'] or _parse(state['next_due_at']) <= now
+        rank = comp[3] if comp[3] is not None else float('-inf')
+        return (not due, -staleness(state, now), -rank, comp[0])
+
+    candidates.sort(key=priority)
+    return candidates[:budget], schedule
+
+def record_fetch(writer, schedule, comp_id, fingerprint, now=None):
+    """Stage the outcome of fetching one competition and its next due time.
+
+    ``fingerprint`` is the standings_fingerprint() of the fetched table; it
+    counts as a change whenever it differs from the one stored last time.
+    Only successful fetches are recorded.
+    """
+    now = now or datetime.utcnow()
+    state = schedule.get(comp_id) or {
+        'last_changed_at': None, 'fetch_count': 0, 'change_count': 0, 'change_rate': INITIAL_CHANGE_RATE,
+        'standings_fingerprint': None,
+    }
+    changed = state['standings_fingerprint'] != fingerprint
+    change_rate = (1 - CHANGE_RATE_ALPHA) * state['change_rate'] + CHANGE_RATE_ALPHA * (1.0 if changed else 0.0)
+    last_changed_at = now.strftime(TIME_FORMAT) if changed else state['last_changed_at']
+    in_season = bool(last_changed_at) and now - _parse(last_changed_at) <= IN_SEASON_WINDOW
+    next_due_at = now + next_interval(change_rate, in_season)
+
+    row = {
+        'competition_id': comp_id,
+        'last_fetched_at': now.strftime(TIME_FORMAT),
+        'last_changed_at': last_changed_at,
+        'fetch_count': state['fetch_count'] + 1,
+        'change_count': state['change_count'] + (1 if changed else 0),
+        'change_rate': round(change_rate, 4),
+        'in_season': in_season,
+        'next_due_at': next_due_at.strftime(TIME_FORMAT),
+        'standings_fingerprint': fingerprint,
+    }
+    schedule[comp_id] = row
+    writer.stage(SCHEDULE_UPSERT, tuple(row[c] for c in SCHEDULE_UPSERT.columns))
+
+def coverage_summary(conn, now=None):
+    """Counts of competitions never fetched, overdue and up to date"""
+    now = (now or datetime.utcnow()).strftime(TIME_FORMAT)
+    return conn.execute(COVERAGE_SQL, (now, now)).fetchone()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+365Scores Replay Server
+Local stand-in for the 365Scores web API that serves recorded
+/web/competitions/ and /web/standings/ payloads with configurable latency,
+jitter and error rates. Point the scripts at it with API_BASE_URL.
+
+Recordings are a directory holding competitions.json and
+standings/<competition_id>.json. They can be captured from the live API
+(record) or synthesized from master/teams_master.json (synthesize)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+ERROR_STATUSES = (500, 502, 503, 429)
+
+class ReplayStats:
+    """Request counters shared by the handler threads"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def add(self, errors=0, not_modified=0, bytes_sent=0):
+        with self._lock:
+            self.requests += 1
+            self.errors += errors
+            self.not_modified += not_modified
+            self.bytes_sent += bytes_sent
+
+    def summary(self):
+        return {
+            'requests': self.requests, 'errors': self.errors,
+            'not_modified': self.not_modified, 'bytes_sent': self.bytes_sent,
+        }
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _payload_path(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") == "/web/competitions":
+            return os.path.join(self.server.recordings, "competitions.json")
+        if url.path.rstrip("/") == "/web/standings":
+            comp_id = parse_qs(url.query).get("competitions", [""])[0]
+            if comp_id.isdigit():
+                return os.path.join(self.server.recordings, "standings", f"{comp_id}.json")
+        return None
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            status = random.choice(ERROR_STATUSES)
+            self._send(status, headers={"Retry-After": "0"} if status == 429 else None)
+            server.stats.add(errors=1)
+            return
+
+        path = self._payload_path()
+        if not path or not os.path.exists(path):
+            self._send(404)
+            server.stats.add()
+            return
+
+        body = server.load(path)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            server.stats.add(not_modified=1)
+            return
+
+        headers = {"Content-Type": "application/json", "ETag": etag, "Cache-Control": "max-age=0"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self._send(200, body, headers)
+        server.stats.add(bytes_sent=len(body))
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, recordings, port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        super().__init__(("127.0.0.1", port), ReplayHandler)
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats = ReplayStats()
+        self._bodies = {}
+        if seed is not None:
+            random.seed(seed)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def load(self, path):
+        body = self._bodies.get(path)
+        if body is None:
+            with open(path, "rb") as f:
+                body = self._bodies[path] = f.read()
+        return body
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        threading.Thread(target=self.serve_forever, name="replay-server", daemon=True).start()
+        return self
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+def synthesize(master_path, out_dir):
+    """Build 365Scores-shaped recordings from teams_master.json"""
+    with open(master_path, encoding="utf-8") as f:
+        teams = json.load(f)
+
+    countries, competitions, rosters = {}, {}, {}
+    for team in teams:
+        if team["country_id"] is not None:
+            countries[team["country_id"]] = team["country_name"]
+        for comp in team["competitions"]:
+            if comp["country_id"] is not None:
+                countries[comp["country_id"]] = comp["country_name"]
+            competitions.setdefault(comp["competition_id"], comp)
+            rosters.setdefault(comp["competition_id"], []).append(team)
+
+    _write_json(os.path.join(out_dir, "competitions.json"), {
+        "countries": [
+            {"id": cid, "name": name, "nameForURL": (name or "").lower().replace(" ", "-"), "imageVersion": 1}
+            for cid, name in sorted(countries.items())
+        ],
+        "competitions": [
+            {
+                "id": comp_id, "countryId": comp["country_id"], "sportId": 1,
+                "name": comp["competition_name"], "longName": comp["long_name"],
+                "nameForURL": (comp["competition_name"] or "").lower().replace(" ", "-"),
+                "hasStandings": bool(comp["has_standings"]), "hasBrackets": bool(comp["has_brackets"]),
+                "hasStats": bool(comp["has_stats"]), "popularityRank": comp["popularity_rank"],
+                "imageVersion": 1, "isInternational": bool(comp["is_international"]), "currentSeasonNum": 1,
+            }
+            for comp_id, comp in sorted(competitions.items())
+        ],
+    })
+    for comp_id, roster in rosters.items():
+        comp = competitions[comp_id]
+        rows = [
+            {
+                "position": position, "points": max(0, 90 - 2 * position),
+                "competitor": {
+                    "id": team["team_id"], "name": team["team_name"],
+                    "nameForURL": (team["team_name"] or "").lower().replace(" ", "-"),
+                    "countryId": team["country_id"], "imageVersion": 1, "isNational": False,
+                },
+            }
+            for position, team in enumerate(roster, 1)
+        ]
+        _write_json(os.path.join(out_dir, "standings", f"{comp_id}.json"), {
+            "competitions": [{"id": comp_id, "name": comp["competition_name"], "currentSeasonNum": 1,
+                              "countryId": comp["country_id"]}],
+            "standings": [{"rows": rows}],
+        })
+    print(f"🧪 Synthesized {len(competitions)} competitions, {len(teams):,} teams into {out_dir}")
+
+def record(out_dir, limit=None):
+    """Capture live payloads: the competitions catalogue and standings for competitions with standings"""
+    from api_client import get_client, competitions_url, standings_url
+
+    client = get_client()
+    catalogue = client.fetch_json(competitions_url())
+    _write_json(os.path.join(out_dir, "competitions.json"), catalogue)
+    comp_ids = [c["id"] for c in catalogue.get("competitions", []) if c.get("hasStandings")]
+    for comp_id in comp_ids[:limit]:
+        data = client.get_json(standings_url(comp_id))
+        if data is not None:
+            _write_json(os.path.join(out_dir, "standings", f"{comp_id}.json"), data)
+    print(f"📼 Recorded {len(comp_ids[:limit])} competitions into {out_dir}")
+    client.stats.report()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local 365Scores stand-in server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="serve a recordings directory")
+    serve.add_argument("--dir", required=True)
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    serve.add_argument("--jitter", type=float, default=0.02, help="+/- seconds of random latency")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 5xx/429")
+    serve.add_argument("--seed", type=int)
+    synth = commands.add_parser("synthesize", help="build recordings from teams_master.json")
+    synth.add_argument("--master", default=os.path.join(os.path.dirname(__file__), "..", "..", "master", "teams_master.json"))
+    synth.add_argument("--out", required=True)
+    rec = commands.add_parser("record", help="capture recordings from the live API")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--limit", type=int, help="record at most this many standings")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = ReplayServer(args.dir, args.port, args.latency, args.jitter, args.error_rate, args.seed)
+        print(f"📡 Replaying {args.dir} on {server.base_url} (latency {args.latency}s ±{args.jitter}s, "
+              f"error rate {args.error_rate:.0%})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(server.stats.summary()))
+    elif args.command == "synthesize":
+        synthesize(args.master, args.out)
+    else:
+        record(args.out, args.limit)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+HTTP Response Cache
+SQLite-backed cache in front of the 365Scores API client
+Entries are keyed by normalized URL, expire after a per-endpoint TTL,
+are revalidated with ETag/Last-Modified and evicted least-recently-used
+once the store grows past its size cap
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from create_schema import resolve_db_path
+
+# Seconds an entry is served without asking the server again, by path prefix
+ENDPOINT_TTLS = {
+    '/web/competitions/': int(os.getenv("HTTP_CACHE_TTL_COMPETITIONS", str(12 * 3600))),
+    '/web/standings/': int(os.getenv("HTTP_CACHE_TTL_STANDINGS", "3600")),
+}
+DEFAULT_TTL = 0
+MAX_CACHE_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+def default_cache_path():
+    """Keep the cache next to the database unless HTTP_CACHE_PATH says otherwise"""
+    return os.getenv("HTTP_CACHE_PATH") or os.path.join(os.path.dirname(resolve_db_path()), "http_cache.sqlite")
+
+def cache_enabled():
+    return os.getenv("HTTP_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+def normalize_url(url):
+    """Canonical cache key: lower-case scheme/host, no default port, sorted query"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+def ttl_for(url):
+    """Look up the TTL configured for the endpoint a URL points at"""
+    path = urlsplit(url).path
+    for prefix, ttl in ENDPOINT_TTLS.items():
+        if path.startswith(prefix):
+            return ttl
+    return DEFAULT_TTL
+
+class CacheEntry:
+    """A cached response body and the validators needed to revalidate it"""
+
+    def __init__(self, body, etag, last_modified, fetched_at, ttl):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    def is_fresh(self, now=None):
+        return ((now or time.time()) - self.fetched_at) < self.ttl
+
+    def validators(self):
+        """Conditional request headers for this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """Thread-safe LRU response store shared by all fetch workers"""
+
+    def __init__(self, path=None, max_bytes=MAX_CACHE_BYTES):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_access ON http_cache(last_access)')
+        self.conn.commit()
+        self._total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+
+    def get(self, url):
+        """Return the CacheEntry for a URL (fresh or stale), or None"""
+        key = normalize_url(url)
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT body, etag, last_modified, fetched_at FROM http_cache WHERE url = ?', (key,)
+            ).fetchone()
+            if not row:
+                return None
+            self.conn.execute('UPDATE http_cache SET last_access = ? WHERE url = ?', (time.time(), key))
+            self.conn.commit()
+        body, etag, last_modified, fetched_at = row
+        return CacheEntry(zlib.decompress(body), etag, last_modified, fetched_at, ttl_for(url))
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Store a 200 response body and evict old entries past the size cap"""
+        if ttl_for(url) <= 0 and not (etag or last_modified):
+            return
+        key = normalize_url(url)
+        stored = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute('SELECT size FROM http_cache WHERE url = ?', (key,)).fetchone()
+            self.conn.execute('''
+                INSERT OR REPLACE INTO http_cache (url, body, etag, last_modified, fetched_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (key, stored, etag, last_modified, now, now, len(stored)))
+            self._total_bytes += len(stored) - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def touch(self, url):
+        """Mark an entry as freshly validated after a 304"""
+        with self._lock:
+            now = time.time()
+            self.conn.execute('UPDATE http_cache SET fetched_at = ?, last_access = ? WHERE url = ?',
+                              (now, now, normalize_url(url)))
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until under max_bytes (lock held)"""
+        while self._total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                'SELECT url, size FROM http_cache ORDER BY last_access ASC LIMIT 32'
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for url, size in rows:
+                self.conn.execute('DELETE FROM http_cache WHERE url = ?', (url,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
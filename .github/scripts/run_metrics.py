@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Times the phases of an update run (schema check, competition selection,
+HTTP fetch, JSON parse, DB write, commit) and stores them with per-endpoint
+latency percentiles, bytes transferred and rows written in run_metrics,
+one row per update_log entry. Fetch and parse run on worker threads, so
+their phase times are busy time summed over all threads
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from create_schema import resolve_db_path, create_update_tables
+
+PHASES = ['schema_check', 'competition_selection', 'http_fetch', 'json_parse', 'db_write', 'shard_merge', 'commit']
+TREND_RUNS = 10
+
+RECENT_RUNS_SQL = '''
+    SELECT u.timestamp, u.update_type, m.wall_seconds, m.requests, m.bytes_wire, m.rows_written, m.phases, m.endpoints
+    FROM run_metrics m
+    JOIN update_log u ON u.id = m.update_log_id
+    ORDER BY m.update_log_id DESC
+    LIMIT ?
+'''
+
+class RunMetrics:
+    """Phase timer for one run; spans may be opened from any thread"""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, count=1):
+        with self._lock:
+            totals = self._phases.setdefault(phase, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += count
+
+    @contextmanager
+    def span(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def collect(self, request_stats, writers):
+        """Fold the client's request stats and the writers' timings into one dict"""
+        for writer in writers:
+            self.add('db_write', writer.write_seconds, writer.flushes)
+            self.add('commit', writer.commit_seconds, writer.commits)
+        network = request_stats.summary()
+        self.add('http_fetch', network['latency_total_s'], network['requests'])
+        self.add('json_parse', network['parse_seconds'], network['parsed'])
+        with self._lock:
+            phases = {
+                phase: {'seconds': round(seconds, 3), 'count': count}
+                for phase, (seconds, count) in sorted(self._phases.items(), key=lambda item: _phase_order(item[0]))
+            }
+        return {
+            'wall_seconds': round(time.perf_counter() - self._started, 3),
+            'requests': network['requests'],
+            'bytes_wire': network['bytes_wire'],
+            'bytes_decoded': network['bytes_decoded'],
+            'rows_written': sum(writer.rows_written for writer in writers),
+            'phases': phases,
+            'endpoints': request_stats.endpoints(),
+        }
+
+    def save(self, conn, update_log_id, request_stats, writers):
+        """Store the run's metrics against an update_log row; returns the stored dict"""
+        metrics = self.collect(request_stats, writers)
+        conn.execute('''
+            INSERT INTO run_metrics (update_log_id, wall_seconds, requests, bytes_wire, rows_written, phases, endpoints)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(update_log_id) DO UPDATE SET
+                wall_seconds = excluded.wall_seconds, requests = excluded.requests,
+                bytes_wire = excluded.bytes_wire, rows_written = excluded.rows_written,
+                phases = excluded.phases, endpoints = excluded.endpoints
+        ''', (update_log_id, metrics['wall_seconds'], metrics['requests'], metrics['bytes_wire'],
+              metrics['rows_written'], json.dumps(metrics['phases'], separators=(',', ':')),
+              json.dumps(metrics['endpoints'], separators=(',', ':'))))
+        return metrics
+
+    def store(self, db_path, update_log_id, request_stats, writers, conn=None):
+        """save() after the writers have closed, on conn or a short-lived connection, and print the report"""
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(db_path)
+        create_update_tables(conn.cursor())
+        metrics = self.save(conn, update_log_id, request_stats, writers)
+        conn.commit()
+        if own:
+            conn.close()
+        report(metrics)
+        return metrics
+
+def _phase_order(phase):
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+def report(metrics):
+    """Print the phase breakdown and endpoint latencies of one run"""
+    print(f"\n⏱️ RUN METRICS ({metrics['wall_seconds']:.1f}s wall)")
+    for phase, totals in metrics['phases'].items():
+        print(f"   {phase:22}: {totals['seconds']:8.3f}s over {totals['count']:,}")
+    for endpoint, stats in metrics['endpoints'].items():
+        print(f"   {endpoint}: {stats['requests']:,} req, p50 {stats['p50_s']:.3f}s, p95 {stats['p95_s']:.3f}s, "
+              f"max {stats['max_s']:.3f}s, {stats['bytes_wire'] / 1024:,.1f} KB")
+
+def recent_runs(conn, limit=TREND_RUNS):
+    """The last runs with metrics, newest first, as dicts"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'run_metrics'").fetchone():
+        return []
+    rows = conn.execute(RECENT_RUNS_SQL, (limit,)).fetchall()
+    return [
+        {
+            'timestamp': timestamp, 'update_type': update_type, 'wall_seconds': wall, 'requests': requests,
+            'bytes_wire': bytes_wire, 'rows_written': rows_written,
+            'phases': json.loads(phases), 'endpoints': json.loads(endpoints),
+        }
+        for timestamp, update_type, wall, requests, bytes_wire, rows_written, phases, endpoints in rows
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the stored metrics of recent runs")
+    parser.add_argument("--runs", type=int, default=TREND_RUNS)
+    args = parser.parse_args()
+    print(f"⏱️ RUN METRICS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    conn = sqlite3.connect(resolve_db_path())
+    print(json.dumps(recent_runs(conn, args.runs), indent=2))
+    conn.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Sharded Population
+Splits the team phase of a full population across worker processes. Each
+worker fetches and parses its share of the competitions into its own shard
+SQLite file with no indexes or triggers; the main process then merges the
+shards into soccer_data_colab.db with ATTACH and INSERT ... SELECT, so the
+database's own triggers still see every row. Team rows are merged with the
+same TEAM_UPSERT as the single-process path, and main_competition_id is then
+set by the shared MAIN_COMPETITION_SQL rule, so the result does not depend
+on the shard count or the order the fetches finished in
+Each shard records its finished competitions in shard_progress, committed
+with their rows every CHECKPOINT_EVERY competitions. Shard files left by a
+killed run are merged before the next run picks its work, so no finished
+competition is fetched again
+"""
+
+import glob
+import math
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from api_client import get_client, standings_url
+from db_writer import BulkWriter, TEAM_UPSERT, TEAM_COMPETITION_UPSERT
+from ingest_pipeline import IngestPipeline
+from standings_fetcher import DEFAULT_CONCURRENCY, DEFAULT_MAX_RPS
+
+TEAM_COLUMNS = ', '.join(TEAM_UPSERT.columns)
+SHARD_TEAM_SQL = f"INSERT INTO shard_teams (seq, {TEAM_COLUMNS}) VALUES (?, {', '.join('?' for _ in TEAM_UPSERT.columns)})"
+SHARD_LINK_SQL = 'INSERT INTO shard_links (team_id, competition_id, season_num) VALUES (?, ?, ?)'
+SHARD_PROGRESS_SQL = 'INSERT INTO shard_progress (competition_id, error) VALUES (?, ?)'
+
+# One row per team id, so the upsert sees each team once. Which copy is picked
+# does not matter: main_competition_id is only kept for new teams and is
+# reassigned by MAIN_COMPETITION_SQL after the merge
+MERGE_TEAMS_SOURCE = f'''
+    SELECT {TEAM_COLUMNS} FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY id ORDER BY seq, rowid) AS pick FROM temp.shard_teams
+    ) WHERE pick = 1
+'''
+MERGE_LINKS_SOURCE = '''
+    SELECT DISTINCT team_id, competition_id, season_num, 1 FROM temp.shard_links WHERE season_num IS NOT NULL
+'''
+MERGE_LINKS_NO_SEASON_SQL = '''
+    INSERT INTO team_competitions (team_id, competition_id, season_num, is_active)
+    SELECT DISTINCT m.team_id, m.competition_id, NULL, 1
+    FROM temp.shard_links m
+    WHERE m.season_num IS NULL AND NOT EXISTS (
+        SELECT 1 FROM team_competitions tc
+        WHERE tc.team_id = m.team_id AND tc.competition_id = m.competition_id AND tc.season_num IS NULL
+    )
+'''
+
+def create_shard_tables(conn, schema='main'):
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {schema}.shard_teams (seq INTEGER NOT NULL, {TEAM_COLUMNS})')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {schema}.shard_links (team_id INTEGER NOT NULL, competition_id INTEGER NOT NULL, season_num INTEGER)')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {schema}.shard_progress (competition_id INTEGER NOT NULL, error TEXT)')
+
+def shard_dir(db_path):
+    return os.path.join(os.path.dirname(db_path), 'shards')
+
+def remove_shard(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def populate_shard(shard_path, jobs, workers, max_rps):
+    """Worker process: fetch one shard's competitions into shard_path.
+
+    ``jobs`` are (url, seq, comp_id, comp_name, db_season_num). Returns the
+    per-competition outcomes, the client's RequestStats and the writer totals.
+    """
+    # Imported here: the main script imports this module lazily
+    from full_database_population import parse_standings_teams, team_row, CHECKPOINT_EVERY
+
+    remove_shard(shard_path)
+    outcomes = []
+    writers = []
+
+    def fetch(job):
+        url, _, _, comp_name, _ = job
+        print(f"  🌐 Teams for {comp_name}...")
+        return parse_standings_teams(get_client().fetch_json(url))
+
+    def write(writer, job, result, error):
+        _, seq, comp_id, comp_name, db_season = job
+        staged = writer.rows_staged
+        if error is not None:
+            print(f"  ❌ {comp_name}: {error}")
+            writer.stage(SHARD_PROGRESS_SQL, (comp_id, str(error)))
+            outcomes.append((comp_id, str(error), 0))
+            return writer.rows_staged - staged
+        season_num, teams = result
+        if season_num is None:
+            season_num = db_season
+        for team_data in teams:
+            writer.stage(SHARD_TEAM_SQL, (seq,) + team_row(team_data, comp_id))
+            writer.stage(SHARD_LINK_SQL, (team_data['id'], comp_id, season_num))
+        writer.stage(SHARD_PROGRESS_SQL, (comp_id, None))
+        outcomes.append((comp_id, None, len(teams)))
+        print(f"  ✅ Added {len(teams)} teams for {comp_name}")
+        if len(outcomes) % CHECKPOINT_EVERY == 0:
+            writer.commit()
+        return writer.rows_staged - staged
+
+    def open_writer():
+        writer = BulkWriter(shard_path)
+        create_shard_tables(writer.conn)
+        writers.append(writer)
+        return writer
+
+    IngestPipeline(fetch, write, open_writer, close_writer=lambda w: w.close(),
+                   workers=workers, max_rps=max_rps).run(jobs)
+    return outcomes, get_client().stats, [writer.totals() for writer in writers]
+
+def merge_shards(db_path, shard_paths, conn=None):
+    """Merge every shard and record its progress in one transaction on db_path (or conn)"""
+    from full_database_population import record_progress
+
+    writer = BulkWriter(db_path, conn=conn)
+    conn = writer.conn
+    create_shard_tables(conn, 'temp')
+    for path in shard_paths:
+        if not os.path.exists(path):
+            continue
+        # ATTACH is not allowed inside a transaction, so each copy commits on its own
+        conn.execute('ATTACH DATABASE ? AS shard', (path,))
+        conn.execute('INSERT INTO temp.shard_teams SELECT * FROM shard.shard_teams')
+        conn.execute('INSERT INTO temp.shard_links SELECT * FROM shard.shard_links')
+        conn.execute('INSERT INTO temp.shard_progress SELECT * FROM shard.shard_progress')
+        conn.commit()
+        conn.execute('DETACH DATABASE shard')
+
+    teams = conn.execute(TEAM_UPSERT.from_select(MERGE_TEAMS_SOURCE)).rowcount
+    links = conn.execute(TEAM_COMPETITION_UPSERT.from_select(MERGE_LINKS_SOURCE)).rowcount
+    links += conn.execute(MERGE_LINKS_NO_SEASON_SQL).rowcount
+    for comp_id, error in conn.execute('SELECT competition_id, error FROM temp.shard_progress').fetchall():
+        record_progress(writer, comp_id, error)
+    writer.rows_written += teams + links
+    writer.close()
+    return writer, teams, links
+
+def merge_interrupted_shards(db_path, conn=None, discard=False):
+    """Merge (or with ``discard``, delete) shard files left by a killed run.
+
+    ``conn`` must have no open transaction, since ATTACH needs autocommit.
+    Returns the number of shard files found.
+    """
+    leftovers = sorted(glob.glob(os.path.join(shard_dir(db_path), 'shard-*.db')))
+    if leftovers and not discard:
+        print(f"♻️ Merging {len(leftovers)} shards left by an interrupted run...")
+        _, teams, links = merge_shards(db_path, leftovers, conn)
+        print(f"  ✅ Merged {teams:,} team rows and {links:,} links changed")
+    for path in leftovers:
+        remove_shard(path)
+    return len(leftovers)
+
+def populate_sharded(db_path, competitions, shards, metrics):
+    """Fetch the teams of ``competitions`` [(comp_id, comp_name)] on ``shards`` processes and merge.
+
+    Returns (teams_added, competitions_done, request_stats, writer_totals).
+    """
+    conn = sqlite3.connect(db_path)
+    seasons = dict(conn.execute('SELECT id, current_season_num FROM competitions'))
+    conn.close()
+
+    jobs = [(standings_url(comp_id), seq, comp_id, comp_name, seasons.get(comp_id))
+            for seq, (comp_id, comp_name) in enumerate(competitions)]
+    # Round-robin so every shard gets a similar mix of large and small competitions
+    shard_jobs = [jobs[i::shards] for i in range(shards)]
+    # Split the request budget so the shards together stay within the usual limits
+    workers = max(1, math.ceil(DEFAULT_CONCURRENCY / shards))
+    max_rps = DEFAULT_MAX_RPS / shards
+
+    os.makedirs(shard_dir(db_path), exist_ok=True)
+    shard_paths = [os.path.join(shard_dir(db_path), f'shard-{i}.db') for i in range(shards)]
+    print(f"🧩 {shards} shards, {workers} fetch workers each, max {max_rps:g} req/s each")
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=shards, mp_context=context) as pool:
+        results = list(pool.map(populate_shard, shard_paths, shard_jobs, [workers] * shards, [max_rps] * shards))
+
+    outcomes = [outcome for shard_outcomes, _, _ in results for outcome in shard_outcomes]
+    request_stats = get_client().stats
+    writer_totals = []
+    for index, (shard_outcomes, stats, totals) in enumerate(results):
+        request_stats.merge(stats)
+        writer_totals.extend(totals)
+        rows = sum(t.rows_written for t in totals)
+        print(f"   Shard {index}: {len(shard_outcomes)} competitions, {stats.requests} requests, {rows:,} rows")
+
+    print(f"🔀 Merging {shards} shards into {os.path.basename(db_path)}...")
+    with metrics.span('shard_merge'):
+        merge_writer, teams, links = merge_shards(db_path, shard_paths)
+    print(f"  ✅ Merged {teams:,} team rows and {links:,} links changed")
+    merge_writer.report()
+    for path in shard_paths:
+        remove_shard(path)
+
+    done = [outcome for outcome in outcomes if outcome[1] is None]
+    return sum(count for _, _, count in done), len(done), request_stats, writer_totals + [merge_writer]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Concurrent Standings Fetcher
+Pulls standings for many competitions at once with a bounded number of
+in-flight requests and a per-host request rate cap
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Tunable from the workflow environment
+DEFAULT_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+DEFAULT_MAX_RPS = float(os.getenv("MAX_REQUESTS_PER_SECOND", "4"))
+
+class HostRateLimiter:
+    """Spaces request start times so no single host sees more than max_rps"""
+
+    def __init__(self, max_rps):
+        self.interval = 1.0 / max_rps if max_rps and max_rps > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        """Sleep until the next free request slot for the url's host"""
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def iter_fetched(jobs, fetch, parse=None, concurrency=DEFAULT_CONCURRENCY, max_rps=DEFAULT_MAX_RPS):
+    """Yield (job, result) pairs in completion order.
+
+    Each job is a tuple whose first two items are (url, description).
+    ``fetch(url, description)`` is a blocking call run on a worker thread;
+    ``parse(job, data)`` runs on the same thread so the caller only receives
+    ready-to-write results.
+    """
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(max_rps)
+    loop = asyncio.get_running_loop()
+
+    def fetch_and_parse(job):
+        data = fetch(job[0], job[1])
+        return parse(job, data) if parse else data
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch") as executor:
+        async def run(job):
+            async with semaphore:
+                await limiter.wait(job[0])
+                result = await loop.run_in_executor(executor, fetch_and_parse, job)
+            return job, result
+
+        tasks = [asyncio.create_task(run(job)) for job in jobs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+def fetch_concurrently(jobs, fetch, on_result, parse=None, concurrency=DEFAULT_CONCURRENCY, max_rps=DEFAULT_MAX_RPS):
+    """Run the fetch engine to completion, handing each result to on_result.
+
+    ``on_result(job, result)`` is always called from the calling thread, so it
+    is safe to write to SQLite from it.
+    """
+    async def consume():
+        async for job, result in iter_fetched(jobs, fetch, parse, concurrency, max_rps):
+            on_result(job, result)
+
+    asyncio.run(consume())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Standings History
+Run-length encoded history of league tables. standings_history holds one row
+per team each time its position or points change, valid from that day until
+the team's next row, so unchanged days and the off-season cost no storage.
+Days are stored as integers (days since 1970-01-01, UTC). Reads answer
+"table on date D" and "team trajectory" from the primary key and one index
+"""
+
+import argparse
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from create_schema import resolve_db_path
+
+EPOCH = date(1970, 1, 1)
+
+# Inserts a team's position/points only when they differ from its latest row on
+# or before that day; a second change on the same day replaces that day's row
+HISTORY_SQL = '''
+    INSERT INTO standings_history (competition_id, season_num, team_id, valid_from, position, points)
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6
+    WHERE NOT EXISTS (
+        SELECT 1 FROM (
+            SELECT position, points FROM standings_history
+            WHERE competition_id = ?1 AND season_num = ?2 AND team_id = ?3 AND valid_from <= ?4
+            ORDER BY valid_from DESC
+            LIMIT 1
+        ) WHERE position IS ?5 AND points IS ?6
+    )
+    ON CONFLICT (competition_id, season_num, team_id, valid_from)
+    DO UPDATE SET position = excluded.position, points = excluded.points
+'''
+
+# The latest season of a competition with a row on or before a day
+SEASON_ON_SQL = '''
+    SELECT season_num FROM standings_history
+    WHERE competition_id = ? AND valid_from <= ?
+    ORDER BY season_num DESC
+    LIMIT 1
+'''
+
+# Bare columns next to MAX() come from the row holding the maximum
+TABLE_ON_SQL = '''
+    SELECT team_id, position, points, MAX(valid_from)
+    FROM standings_history
+    WHERE competition_id = ? AND season_num = ? AND valid_from <= ?
+    GROUP BY team_id
+    ORDER BY position IS NULL, position, team_id
+'''
+
+# {filters} narrows by season and/or competition
+TEAM_TRAJECTORY_SQL = '''
+    SELECT competition_id, season_num, valid_from, position, points
+    FROM standings_history
+    WHERE team_id = ? {filters}
+    ORDER BY season_num, competition_id, valid_from
+'''
+
+# Keeps seasons in step with competitions.current_season_num
+SEASONS_SYNC_SQL = [
+    '''INSERT INTO seasons (competition_id, season_num, is_current)
+       SELECT id, current_season_num, 1 FROM competitions WHERE current_season_num IS NOT NULL
+       ON CONFLICT (competition_id, season_num) DO UPDATE SET is_current = 1 WHERE is_current IS NOT 1''',
+    '''UPDATE seasons SET is_current = 0
+       WHERE is_current = 1
+         AND season_num IS NOT (SELECT current_season_num FROM competitions c WHERE c.id = seasons.competition_id)''',
+]
+
+def day_number(value=None):
+    """Days since 1970-01-01 for a date, datetime or ISO string; today (UTC) by default"""
+    if value is None:
+        value = datetime.utcnow().date()
+    elif isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+def day_date(number):
+    return EPOCH + timedelta(days=number)
+
+def stage_standings(writer, comp_id, season_num, teams_data, day=None):
+    """Stage the standings rows of one competition; returns the rows staged.
+
+    ``teams_data`` are parse_competition_teams() dicts. Nothing is recorded
+    without a season, since rows are keyed by it.
+    """
+    if season_num is None:
+        return 0
+    day = day_number() if day is None else day
+    for team in teams_data:
+        writer.stage(HISTORY_SQL, (comp_id, season_num, team['team_id'], day, team.get('position'), team.get('points')))
+    return len(teams_data)
+
+def sync_seasons(conn):
+    for sql in SEASONS_SYNC_SQL:
+        conn.execute(sql)
+
+def table_on(conn, comp_id, on=None, season_num=None):
+    """[(team_id, position, points, since)] for a competition as it stood on a day.
+
+    Without ``season_num`` the latest season with data on that day is used.
+    """
+    day = day_number(on)
+    if season_num is None:
+        row = conn.execute(SEASON_ON_SQL, (comp_id, day)).fetchone()
+        if not row:
+            return []
+        season_num = row[0]
+    return [
+        (team_id, position, points, day_date(since))
+        for team_id, position, points, since in conn.execute(TABLE_ON_SQL, (comp_id, season_num, day))
+    ]
+
+def team_trajectory(conn, team_id, comp_id=None, season_num=None):
+    """[(competition_id, season_num, since, position, points)] for a team, oldest first"""
+    filters, params = '', [team_id]
+    if season_num is not None:
+        filters += ' AND season_num = ?'
+        params.append(season_num)
+    if comp_id is not None:
+        filters += ' AND competition_id = ?'
+        params.append(comp_id)
+    return [
+        (comp, season, day_date(since), position, points)
+        for comp, season, since, position, points in conn.execute(TEAM_TRAJECTORY_SQL.format(filters=filters), params)
+    ]
+
+def history_summary(conn):
+    """Stored rows against the rows one snapshot per team per day would need"""
+    rows, days = conn.execute('''
+        SELECT COUNT(*), COALESCE(MAX(valid_from) - MIN(valid_from) + 1, 0) FROM standings_history
+    ''').fetchone()
+    series = conn.execute('''
+        SELECT COUNT(*) FROM (SELECT DISTINCT competition_id, season_num, team_id FROM standings_history)
+    ''').fetchone()[0]
+    return {'rows': rows, 'series': series, 'days': days, 'daily_snapshot_rows': series * days}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the standings history")
+    commands = parser.add_subparsers(dest="command", required=True)
+    table = commands.add_parser("table", help="a competition's table on a date")
+    table.add_argument("competition", type=int)
+    table.add_argument("--date", help="YYYY-MM-DD (default: today)")
+    table.add_argument("--season", type=int)
+    team = commands.add_parser("team", help="a team's positions over time")
+    team.add_argument("team", type=int)
+    team.add_argument("--competition", type=int)
+    team.add_argument("--season", type=int)
+    commands.add_parser("summary", help="storage used against daily snapshots")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{resolve_db_path()}?mode=ro", uri=True)
+    if args.command == "table":
+        for team_id, position, points, since in table_on(conn, args.competition, args.date, args.season):
+            print(f"  {position if position is not None else '-':>3}  {team_id:>8}  {points if points is not None else '-':>4} pts  (since {since})")
+    elif args.command == "team":
+        for comp, season, since, position, points in team_trajectory(conn, args.team, args.competition, args.season):
+            print(f"  {since}  competition {comp} season {season}: position {position}, {points} pts")
+    else:
+        summary = history_summary(conn)
+        print(f"📈 {summary['rows']:,} history rows for {summary['series']:,} team standings over {summary['days']:,} days "
+              f"({summary['daily_snapshot_rows']:,} as daily snapshots)")
+    conn.close()
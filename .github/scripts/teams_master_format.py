@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+teams_master v2 Format
+Normalized encoding of teams_master.json: countries and competitions are
+stored once in lookup tables and teams refer to them by ID using compact
+array records. The file can optionally be gzip or zstd compressed.
+load_teams_master() reads either format and returns the v1 list shape
+
+v2 document layout (keys are short on purpose):
+    {
+      "format": "teams_master", "version": 2,
+      "t": [[team_id, name, country_id, main_competition_id, [competition_id, ...], [inactive_id, ...]?], ...],
+      "c": {"<competition_id>": [name, long_name, country_id, popularity_rank, flags, null_flags?], ...},
+      "k": {"<country_id>": name, ...}
+    }
+Competition flags are a bitmask over FLAG_FIELDS; null_flags marks flags
+that were null and is only present when non-zero.
+"""
+
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT_NAME = "teams_master"
+FORMAT_VERSION = 2
+
+FLAG_FIELDS = [
+    "has_standings", "has_live_standings", "has_standings_groups", "has_brackets",
+    "has_stats", "has_history", "is_international",
+]
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+def _pack_flags(competition):
+    flags = nulls = 0
+    for bit, field in enumerate(FLAG_FIELDS):
+        value = competition.get(field)
+        if value is None:
+            nulls |= 1 << bit
+        elif value:
+            flags |= 1 << bit
+    return flags, nulls
+
+def _unpack_flags(flags, nulls):
+    return {
+        field: None if nulls & (1 << bit) else bool(flags & (1 << bit))
+        for bit, field in enumerate(FLAG_FIELDS)
+    }
+
+def open_output(path, compression=None):
+    """Open a binary writer for path, compressing if asked"""
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=9)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requested but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=19).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+def write_v2(out, entries):
+    """Stream v1-shaped team entries to a binary file object as a v2 document.
+
+    Teams are written as they arrive; the competition and country tables are
+    collected along the way and written after them, so only the (small)
+    lookup tables are held in memory.
+    """
+    competitions = {}
+    countries = {}
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    out.write(f'{{"format":"{FORMAT_NAME}","version":{FORMAT_VERSION},"t":['.encode("utf-8"))
+    count = 0
+    for entry in entries:
+        if entry["country_id"] is not None:
+            countries.setdefault(str(entry["country_id"]), entry["country_name"])
+        comp_ids = []
+        inactive = []
+        for comp in entry["competitions"]:
+            key = str(comp["competition_id"])
+            if key not in competitions:
+                flags, nulls = _pack_flags(comp)
+                record = [comp["competition_name"], comp["long_name"], comp["country_id"],
+                          comp["popularity_rank"], flags]
+                if nulls:
+                    record.append(nulls)
+                competitions[key] = record
+                if comp["country_id"] is not None:
+                    countries.setdefault(str(comp["country_id"]), comp["country_name"])
+            comp_ids.append(comp["competition_id"])
+            if not comp["is_active"]:
+                inactive.append(comp["competition_id"])
+        record = [entry["team_id"], entry["team_name"], entry["country_id"], entry["main_competition_id"], comp_ids]
+        if inactive:
+            record.append(inactive)
+        out.write((b"," if count else b"") + dumps(record).encode("utf-8"))
+        count += 1
+    out.write(b'],"c":' + dumps(competitions).encode("utf-8"))
+    out.write(b',"k":' + dumps(countries).encode("utf-8") + b"}")
+    return count
+
+def expand_v2(doc):
+    """Expand a parsed v2 document back into the v1 list of team dicts"""
+    countries = doc["k"]
+    competitions = {}
+    for key, record in doc["c"].items():
+        name, long_name, country_id, popularity_rank, flags = record[:5]
+        nulls = record[5] if len(record) > 5 else 0
+        competitions[int(key)] = (name, long_name, country_id, popularity_rank, _unpack_flags(flags, nulls))
+
+    teams = []
+    for record in doc["t"]:
+        team_id, name, country_id, main_competition_id, comp_ids = record[:5]
+        inactive = set(record[5]) if len(record) > 5 else set()
+        entry_comps = []
+        for comp_id in comp_ids:
+            comp_name, long_name, comp_country_id, popularity_rank, flags = competitions[comp_id]
+            comp = {
+                "competition_id": comp_id,
+                "competition_name": comp_name,
+                "long_name": long_name,
+                "country_id": comp_country_id,
+                "country_name": countries.get(str(comp_country_id)) if comp_country_id is not None else None,
+                "popularity_rank": popularity_rank,
+            }
+            comp.update(flags)
+            comp["is_active"] = comp_id not in inactive
+            comp["is_main_competition"] = comp_id == main_competition_id
+            entry_comps.append(comp)
+        teams.append({
+            "team_id": team_id,
+            "team_name": name,
+            "country_id": country_id,
+            "country_name": countries.get(str(country_id)) if country_id is not None else None,
+            "main_competition_id": main_competition_id,
+            "competitions": entry_comps,
+            "total_competitions": len(entry_comps),
+        })
+    return teams
+
+def read_bytes(path):
+    """Read a teams_master file, undoing gzip/zstd compression if present"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(GZIP_MAGIC):
+        return gzip.decompress(raw)
+    if raw.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError(f"{os.path.basename(path)} is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    return raw
+
+def load_teams_master(path):
+    """Load teams_master in either format and return the v1 list of teams"""
+    doc = json.loads(read_bytes(path))
+    if isinstance(doc, dict) and doc.get("format") == FORMAT_NAME:
+        if doc.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported teams_master version: {doc.get('version')}")
+        return expand_v2(doc)
+    return doc
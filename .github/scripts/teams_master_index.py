@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+teams_master.json Lookup Index
+Reads single teams out of master/teams_master.json without loading the file.
+A sidecar index (teams_master.idx.json) maps each team_id to the byte range
+of its record and each country_id / competition_id to its team IDs; the data
+file is memory-mapped and only the requested records are decoded.
+The index is rebuilt when the file's size or content hash no longer matches
+"""
+
+import hashlib
+import json
+import mmap
+import os
+
+INDEX_VERSION = 2
+
+def resolve_master_path():
+    """Resolve master/teams_master.json using GITHUB_WORKSPACE if available."""
+    workspace = os.getenv("GITHUB_WORKSPACE")
+    if workspace:
+        return os.path.join(workspace, "master", "teams_master.json")
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "master", "teams_master.json"))
+
+def index_path_for(json_path):
+    return os.path.splitext(json_path)[0] + ".idx.json"
+
+def file_digest(path):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def postings(pairs):
+    """Group (key, team_id) pairs into {str(key): [team_id, ...]}"""
+    grouped = {}
+    for key, team_id in pairs:
+        if key is not None:
+            grouped.setdefault(str(key), []).append(team_id)
+    return grouped
+
+def load_index(json_path):
+    """Return the index if it still describes the file on disk, else None.
+
+    A size/mtime match is trusted. If only the mtime moved (a git checkout
+    or copy) the content hash decides, and a matching index is re-stamped.
+    """
+    path = index_path_for(json_path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+        stat = os.stat(json_path)
+    except (OSError, ValueError):
+        return None
+    source = index.get("source", {})
+    if index.get("version") != INDEX_VERSION or source.get("size") != stat.st_size:
+        return None
+    if source.get("mtime_ns") == stat.st_mtime_ns:
+        return index
+    if source.get("sha256") != file_digest(json_path):
+        return None
+    source["mtime_ns"] = stat.st_mtime_ns
+    try:
+        _write(path, index)
+    except OSError:
+        pass
+    return index
+
+def _write(path, index):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+def write_index(json_path, offsets, countries, competitions):
+    """Atomically write the index next to the JSON file"""
+    stat = os.stat(json_path)
+    index = {
+        "version": INDEX_VERSION,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(json_path)},
+        "teams": offsets,
+        "countries": countries,
+        "competitions": competitions,
+    }
+    _write(index_path_for(json_path), index)
+    return index
+
+def scan_records(data):
+    """Yield (offset, length, record) for each element of a top-level JSON list.
+
+    Offsets are in bytes. A record's span starts after the preceding comma or
+    line break, so indentation is kept and copied spans stay byte-identical.
+    """
+    text = data.decode("utf-8")
+    decoder = json.JSONDecoder()
+    pos = text.index("[") + 1
+    byte_pos = len(text[:pos].encode("utf-8"))
+    while True:
+        skipped = pos
+        while text[pos] in ",\r\n":
+            pos += 1
+        start = pos
+        while text[pos] in " \t\r\n":
+            pos += 1
+        if text[pos] == "]":
+            return
+        byte_pos += start - skipped  # separators are single-byte
+        record, end = decoder.raw_decode(text, pos)
+        length = len(text[start:end].encode("utf-8"))
+        yield byte_pos, length, record
+        byte_pos += length
+        pos = end
+
+def build_index(json_path):
+    """Scan the JSON file once and write a fresh index for it"""
+    with open(json_path, "rb") as f:
+        data = f.read()
+    offsets = {}
+    country_pairs = []
+    competition_pairs = []
+    for offset, length, team in scan_records(data):
+        offsets[str(team["team_id"])] = [offset, length]
+        country_pairs.append((team.get("country_id"), team["team_id"]))
+        competition_pairs.extend((c["competition_id"], team["team_id"]) for c in team.get("competitions", []))
+    return write_index(json_path, offsets, postings(country_pairs), postings(competition_pairs))
+
+class TeamsMaster:
+    """Lazy, indexed read access to teams_master.json
+
+    >>> with TeamsMaster(path) as master:
+    ...     master.team(1234)
+    ...     master.teams_in_competition(7)
+    """
+
+    def __init__(self, json_path=None):
+        self.json_path = json_path or resolve_master_path()
+        self.index = load_index(self.json_path)
+        self.rebuilt = self.index is None
+        if self.rebuilt:
+            self.index = build_index(self.json_path)
+        self._file = open(self.json_path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index["teams"])
+
+    def __contains__(self, team_id):
+        return str(team_id) in self.index["teams"]
+
+    def team(self, team_id):
+        """Decode one team's record, or None if it is not in the file"""
+        span = self.index["teams"].get(str(team_id))
+        if span is None:
+            return None
+        offset, length = span
+        return json.loads(self._data[offset:offset + length])
+
+    def team_ids_in_competition(self, competition_id):
+        return self.index["competitions"].get(str(competition_id), [])
+
+    def team_ids_in_country(self, country_id):
+        return self.index["countries"].get(str(country_id), [])
+
+    def teams_in_competition(self, competition_id):
+        return [self.team(team_id) for team_id in self.team_ids_in_competition(competition_id)]
+
+    def teams_in_country(self, country_id):
+        return [self.team(team_id) for team_id in self.team_ids_in_country(country_id)]
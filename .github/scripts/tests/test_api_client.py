@@ -0,0 +1,90 @@
+import gzip
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import api_client
+from api_client import ApiClient, ApiError
+
+GOOD_BODY = json.dumps({"standings": [], "competitions": []}).encode("utf-8")
+
+def serve(responses):
+    """Start a local server answering GETs from ``responses``, one per request.
+
+    Each response is (headers, body, declared_length); the last one repeats.
+    Returns (base_url, server, request_count).
+    """
+    served = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            headers, body, declared = responses[min(len(served), len(responses) - 1)]
+            served.append(self.path)
+            self.send_response(200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(declared if declared is not None else len(body)))
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server, served
+
+@pytest.fixture
+def client():
+    client = ApiClient(max_attempts=3, read_timeout=5)
+    client._backoff = lambda attempt, retry_after=None: 0
+    yield client
+    client.close()
+
+def test_truncated_body_is_retried(client):
+    truncated = ({"Content-Type": "application/json"}, GOOD_BODY[:10], len(GOOD_BODY) + 100)
+    good = ({"Content-Type": "application/json"}, GOOD_BODY, None)
+    base, server, served = serve([truncated, good])
+    try:
+        status, body, _ = client.get(base + "/web/standings/")
+    finally:
+        server.shutdown()
+    assert status == 200
+    assert body == GOOD_BODY
+    assert len(served) == 2
+    assert client.stats.retries == 1
+
+def test_corrupt_gzip_body_raises_api_error(client):
+    corrupt = gzip.compress(GOOD_BODY)[:-12] + b"\x00" * 12
+    base, server, served = serve([({"Content-Encoding": "gzip"}, corrupt, None)])
+    try:
+        with pytest.raises(ApiError):
+            client.get(base + "/web/standings/")
+    finally:
+        server.shutdown()
+    assert len(served) == 3
+    assert client.stats.failures == 3
+
+def test_make_api_request_survives_bad_body(client, monkeypatch):
+    base, server, _ = serve([({"Content-Encoding": "gzip"}, b"not gzip at all", None)])
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+    try:
+        assert api_client.make_api_request(base + "/web/standings/", "Bad body") is None
+    finally:
+        server.shutdown()
+
+def test_stream_cut_short_raises_api_error(client):
+    catalogue = json.dumps({"countries": [{"id": i} for i in range(2000)]}).encode("utf-8")
+    base, server, _ = serve([({"Content-Type": "application/json"}, catalogue[:5000], len(catalogue))])
+    try:
+        with pytest.raises(ApiError):
+            for _ in client.stream_json_arrays(base + "/web/competitions/", ("countries",)):
+                pass
+    finally:
+        server.shutdown()
+    assert client.stats.failures == 1
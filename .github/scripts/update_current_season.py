@@ -6,65 +6,45 @@ This is the main daily update script
 """
 
 import sqlite3
-import requests
+import hashlib
 import json
 import time
 import os
 from datetime import datetime
 
+from create_schema import create_update_tables, create_export_tracking, create_search_index, create_change_tracking, create_aggregate_tables
+from migrations import migrate
+from api_client import make_api_request, get_client, standings_url
+from db_writer import BulkWriter, Upsert, TEAM_UPSERT, TEAM_COMPETITION_UPSERT, TEAM_COMPETITION_NO_SEASON_SQL, assign_main_competitions
+from refresh_scheduler import select_due_competitions, load_schedule, record_fetch, standings_fingerprint, coverage_summary, REFRESH_BUDGET
+from standings_fetcher import fetch_concurrently, DEFAULT_CONCURRENCY, DEFAULT_MAX_RPS
+from run_metrics import RunMetrics
+from standings_history import stage_standings, sync_seasons, day_number
+from profiling import profile_run
+
 def resolve_db_path():
     workspace = os.getenv("GITHUB_WORKSPACE")
     if workspace:
         return os.path.join(workspace, "new_project", "db", "soccer_data_colab.db")
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "new_project", "db", "soccer_data_colab.db"))
 
-# 365Scores API Configuration
-LANG_ID = 9
-TZ_NAME = "UTC"
-USER_COUNTRY_ID = 331
-APP_ID = 5
+DB_PATH = resolve_db_path()
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Mobile Safari/537.36',
-    'Accept': '*/*',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Accept-Encoding': 'gzip, deflate, br, zstd',
-    'Cache-Control': 'no-cache',
-    'Pragma': 'no-cache',
-    'Origin': 'https://www.365scores.com',
-    'Referer': 'https://www.365scores.com/',
-    'Sec-Ch-Ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
-    'Sec-Ch-Ua-Mobile': '?1',
-    'Sec-Ch-Ua-Platform': '"Android"',
-    'Sec-Fetch-Dest': 'empty',
-    'Sec-Fetch-Mode': 'cors',
-    'Sec-Fetch-Site': 'same-site'
-}
+SEED_COMPETITION_UPSERT = Upsert('competitions', [
+    'id', 'name', 'has_standings', 'popularity_rank', 'sport_id', 'country_id', 'current_season_num'
+], key=['id'])
 
-DB_PATH = resolve_db_path()
+FINGERPRINT_UPSERT = Upsert('competition_fingerprints', [
+    'competition_id', 'fingerprint', 'team_count', 'updated_at'
+], key=['competition_id'])
 
-def make_api_request(url, description=""):
-    """Make API request with error handling"""
-    try:
-        print(f"  🌐 {description}...")
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"    ❌ HTTP {response.status_code}")
-            return None
-            
-    except requests.exceptions.RequestException as e:
-        print(f"    ❌ Request failed: {e}")
-        return None
-    except json.JSONDecodeError:
-        print(f"    ❌ Invalid JSON response")
-        return None
+SEASON_UPDATE_SQL = 'UPDATE competitions SET current_season_num = ? WHERE id = ?'
 
-def get_active_competitions():
+def get_active_competitions(conn=None):
     """Get list of competitions that should be updated daily"""
-    conn = sqlite3.connect(DB_PATH)
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # First check if we have any competitions in the database
@@ -87,53 +67,49 @@ def get_active_competitions():
         competitions = []
         for comp_id in major_competitions:
             # Try to get standings to verify the competition is active
-            url = f"https://webws.365scores.com/web/standings/?competitions={comp_id}&live=false&appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}"
-            data = make_api_request(url, f"Checking competition {comp_id}")
+            data = make_api_request(standings_url(comp_id), f"Checking competition {comp_id}")
             
             if data and 'competitions' in data and len(data['competitions']) > 0:
                 comp_data = data['competitions'][0]
                 competitions.append((comp_id, comp_data.get('name', f'Competition {comp_id}'), True, comp_data.get('popularityRank', 999)))
                 
                 # Insert competition into database
-                cursor.execute('''
-                    INSERT OR REPLACE INTO competitions 
-                    (id, name, has_standings, popularity_rank, sport_id, country_id)
-                    VALUES (?, ?, ?, ?, 1, ?)
-                ''', (comp_id, comp_data.get('name'), True, comp_data.get('popularityRank', 999), comp_data.get('countryId')))
+                cursor.execute(SEED_COMPETITION_UPSERT.sql, (
+                    comp_id, comp_data.get('name'), True, comp_data.get('popularityRank', 999), 1,
+                    comp_data.get('countryId'), comp_data.get('currentSeasonNum')
+                ))
                 
                 print(f"  ✅ Added {comp_data.get('name')} to database")
                 time.sleep(1)  # Rate limit
         
         conn.commit()
     else:
-        # Get competitions from database (normal operation)
-        cursor.execute('''
-            SELECT DISTINCT c.id, c.name, c.has_standings, c.popularity_rank
-            FROM competitions c
-            WHERE c.has_standings = 1 
-            ORDER BY c.popularity_rank ASC NULLS LAST
-            LIMIT 100
-        ''')
-        competitions = cursor.fetchall()
+        # Normal operation: spend the request budget on the most likely stale competitions
+        create_update_tables(cursor)
+        conn.commit()
+        migrate(conn)
+        competitions, _ = select_due_competitions(conn, REFRESH_BUDGET)
     
-    conn.close()
+    if own:
+        conn.close()
     
     print(f"📊 Found {len(competitions)} active competitions to update")
     return competitions
 
-def update_competition_teams(comp_id, comp_name):
-    """Update teams for a specific competition"""
-    # Get current standings
-    url = f"https://webws.365scores.com/web/standings/?appTypeId={APP_ID}&langId={LANG_ID}&timezoneName={TZ_NAME}&userCountryId={USER_COUNTRY_ID}&competitions={comp_id}"
-    
-    data = make_api_request(url, f"Fetching {comp_name} standings")
+def parse_competition_teams(data, comp_id, comp_name):
+    """Extract team rows from a standings payload"""
     if not data:
-        return 0
+        return []
     
     standings = data.get('standings', [])
     if not standings or 'rows' not in standings[0]:
         print(f"    ⚠️ No standings data for {comp_name}")
-        return 0
+        return []
+    
+    # Season the standings belong to, as reported by the payload itself
+    payload_comps = data.get('competitions') or [{}]
+    comp_info = next((c for c in payload_comps if c.get('id') == comp_id), payload_comps[0])
+    season_num = comp_info.get('currentSeasonNum')
     
     teams_data = []
     for row in standings[0]['rows']:
@@ -147,58 +123,98 @@ def update_competition_teams(comp_id, comp_name):
                 'image_version': competitor.get('imageVersion'),
                 'is_national': competitor.get('isNational', False),
                 'competition_id': comp_id,
+                'season_num': season_num,
                 'position': row.get('position'),
                 'points': row.get('points')
             })
     
+    return teams_data
+
+# Set FORCE_WRITE=1 to rewrite every competition regardless of fingerprints
+FORCE_WRITE = os.getenv("FORCE_WRITE", "0") == "1"
+
+def roster_fingerprint(teams_data, season_num=None):
+    """Stable hash of the normalized roster fields this script writes"""
+    roster = [season_num] + sorted(
+        (t['team_id'], t['team_name'] or '', t['team_name_for_url'] or '', t['team_country_id'],
+         t['image_version'], bool(t['is_national']))
+        for t in teams_data
+    )
+    return hashlib.sha256(json.dumps(roster, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def load_seasons(conn):
+    """Map competition_id -> current_season_num as stored in the database"""
+    return dict(conn.execute('SELECT id, current_season_num FROM competitions'))
+
+def resolve_season(comp_id, teams_data, known_seasons):
+    """Pick the season for a competition once: payload first, then database"""
+    payload_season = teams_data[0].get('season_num') if teams_data else None
+    if payload_season is not None:
+        return payload_season
+    return known_seasons.get(comp_id)
+
+def load_fingerprints(conn):
+    """Map competition_id -> fingerprint of the last roster written"""
+    return dict(conn.execute('SELECT competition_id, fingerprint FROM competition_fingerprints'))
+
+def update_competition_teams(comp_id, comp_name, writer=None):
+    """Update teams for a specific competition"""
+    data = make_api_request(standings_url(comp_id), f"Fetching {comp_name} standings")
+    teams_data = parse_competition_teams(data, comp_id, comp_name)
+    if writer is not None:
+        stage_standings(writer, comp_id, resolve_season(comp_id, teams_data, load_seasons(writer.conn)), teams_data)
+        return store_competition_teams(comp_id, comp_name, teams_data, writer)
+    with BulkWriter(DB_PATH) as writer:
+        stage_standings(writer, comp_id, resolve_season(comp_id, teams_data, load_seasons(writer.conn)), teams_data)
+        return store_competition_teams(comp_id, comp_name, teams_data, writer)
+
+def store_competition_teams(comp_id, comp_name, teams_data, writer, fingerprint=None, season_num=None, known_seasons=None):
+    """Stage parsed team rows for a competition on the run's bulk writer"""
     if not teams_data:
         print(f"    ⚠️ No teams found for {comp_name}")
         return 0
     
-    # Update database
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    if known_seasons is None:
+        known_seasons = load_seasons(writer.conn)
+    if season_num is None:
+        season_num = resolve_season(comp_id, teams_data, known_seasons)
+    if season_num is not None and known_seasons.get(comp_id) != season_num:
+        writer.stage(SEASON_UPDATE_SQL, (season_num, comp_id))
+        known_seasons[comp_id] = season_num
     
-    updated_teams = 0
-    new_teams = 0
+    fingerprint = fingerprint or roster_fingerprint(teams_data, season_num)
+    writer.stage(FINGERPRINT_UPSERT, (comp_id, fingerprint, len(teams_data), time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())))
     
     for team in teams_data:
-        # Update or insert team
-        cursor.execute('''
-            INSERT OR REPLACE INTO teams (id, name, name_for_url, country_id, main_competition_id, image_version, is_national)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        # Update or insert team; main_competition_id is only used for new teams
+        writer.stage(TEAM_UPSERT, (
             team['team_id'],
             team['team_name'],
             team['team_name_for_url'],
             team['team_country_id'],
-            comp_id,  # Set as main competition
+            comp_id,
             team['image_version'],
             team['is_national']
         ))
         
-        # Check if this is a new team
-        if cursor.rowcount > 0:
-            new_teams += 1
-        
         # Update team_competitions relationship
-        cursor.execute('''
-            INSERT OR REPLACE INTO team_competitions (team_id, competition_id, season_num, is_active)
-            VALUES (?, ?, (SELECT current_season_num FROM competitions WHERE id = ?), 1)
-        ''', (team['team_id'], comp_id, comp_id))
-        
-        updated_teams += 1
-    
-    conn.commit()
-    conn.close()
+        if season_num is not None:
+            writer.stage(TEAM_COMPETITION_UPSERT, (team['team_id'], comp_id, season_num, 1))
+        else:
+            writer.stage(TEAM_COMPETITION_NO_SEASON_SQL, (team['team_id'], comp_id, team['team_id'], comp_id))
     
-    print(f"    ✅ Updated {updated_teams} teams ({new_teams} new)")
-    return updated_teams
+    print(f"    ✅ Staged {len(teams_data)} teams (season {season_num if season_num is not None else 'unknown'})")
+    return len(teams_data)
+
+def update_current_season(conn=None):
+    """Main function to update current season data.
 
-def update_current_season():
-    """Main function to update current season data"""
+    Writes through ``conn`` when given (e.g. the runner's shared connection)
+    and leaves it open; otherwise opens and finalizes its own.
+    """
     print(f"🚀 DAILY DATABASE UPDATE - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print("="*60)
+    metrics = RunMetrics()
     
     # Check if database exists
     if not os.path.exists(DB_PATH):
@@ -206,63 +222,121 @@ def update_current_season():
         return False
     
     # Get active competitions
-    competitions = get_active_competitions()
+    with metrics.span('competition_selection'):
+        competitions = get_active_competitions(conn)
     if not competitions:
         print("❌ No active competitions found in database")
         return False
     
     total_updated = 0
     successful_updates = 0
+    skipped_unchanged = 0
+    failed_fetches = 0
     
-    for i, (comp_id, comp_name, has_standings, popularity_rank) in enumerate(competitions, 1):
-        print(f"\n[{i:2d}/{len(competitions)}] {comp_name} (ID: {comp_id})")
-        
+    jobs = []
+    for comp_id, comp_name, has_standings, popularity_rank in competitions:
         if not has_standings:
-            print(f"    ⏭️ Skipping - no standings available")
+            print(f"    ⏭️ Skipping {comp_name} - no standings available")
             continue
-            
-        teams_updated = update_competition_teams(comp_id, comp_name)
+        jobs.append((standings_url(comp_id), f"Fetching {comp_name} standings", comp_id, comp_name))
+    
+    writer = BulkWriter(DB_PATH, conn=conn)
+    with metrics.span('schema_check'):
+        create_update_tables(writer.conn.cursor())
+        create_export_tracking(writer.conn.cursor())
+        create_search_index(writer.conn.cursor())
+        create_change_tracking(writer.conn.cursor())
+        create_aggregate_tables(writer.conn.cursor())
+        migrate(writer.conn)
+    fingerprints = {} if FORCE_WRITE else load_fingerprints(writer.conn)
+    known_seasons = load_seasons(writer.conn)
+    schedule = load_schedule(writer.conn)
+    # One day for the whole run, even when it runs past midnight
+    history_day = day_number()
+    print(f"⚡ Fetching {len(jobs)} competitions ({DEFAULT_CONCURRENCY} concurrent, max {DEFAULT_MAX_RPS:g} req/s)")
+    processed = 0
+    
+    def parse(job, data):
+        _, _, comp_id, comp_name = job
+        # None marks a failed fetch, as opposed to a payload without standings
+        if data is None:
+            return None
+        return parse_competition_teams(data, comp_id, comp_name)
+    
+    def on_result(job, teams_data):
+        nonlocal total_updated, successful_updates, skipped_unchanged, failed_fetches, processed
+        _, _, comp_id, comp_name = job
+        processed += 1
+        print(f"\n[{processed:2d}/{len(jobs)}] {comp_name} (ID: {comp_id})")
+        
+        if teams_data is None:
+            # Not recorded in the schedule, so the competition stays due for the next run
+            print(f"    ❌ Fetch failed - still due")
+            failed_fetches += 1
+            return
+        
+        season_num = resolve_season(comp_id, teams_data, known_seasons)
+        fingerprint = roster_fingerprint(teams_data, season_num) if teams_data else None
+        changed = bool(fingerprint) and fingerprints.get(comp_id) != fingerprint
+        # The schedule follows the standings, which move every matchday; rosters rarely do
+        record_fetch(writer, schedule, comp_id, standings_fingerprint(teams_data, season_num))
+        # Positions and points are not part of the fingerprint, so record them before the skip
+        stage_standings(writer, comp_id, season_num, teams_data, history_day)
+        if fingerprint and not changed:
+            print(f"    ⏭️ Unchanged since last update - skipping write")
+            skipped_unchanged += 1
+            successful_updates += 1
+            return
+        
+        teams_updated = store_competition_teams(comp_id, comp_name, teams_data, writer, fingerprint,
+                                                season_num, known_seasons)
         
         if teams_updated > 0:
             total_updated += teams_updated
             successful_updates += 1
         
-        # Rate limiting
-        time.sleep(1)
-        
         # Progress update every 10 competitions
-        if i % 10 == 0:
-            print(f"\n📊 Progress: {i}/{len(competitions)} competitions processed")
+        if processed % 10 == 0:
+            print(f"\n📊 Progress: {processed}/{len(jobs)} competitions processed")
             print(f"   Teams updated: {total_updated}, Successful updates: {successful_updates}")
     
+    try:
+        fetch_concurrently(jobs, make_api_request, on_result, parse=parse)
+    except BaseException:
+        writer.abort()
+        raise
+    
     # Final summary
     print(f"\n🎯 UPDATE COMPLETE")
     print(f"   Competitions processed: {len(competitions)}")
     print(f"   Successful updates: {successful_updates}")
+    print(f"   Unchanged (skipped): {skipped_unchanged}")
+    print(f"   Failed fetches: {failed_fetches}")
+    writer.flush()
+    never, overdue, fresh = coverage_summary(writer.conn)
+    print(f"   Coverage: {fresh or 0} up to date, {overdue or 0} overdue, {never or 0} never fetched")
     print(f"   Total teams updated: {total_updated}")
+    get_client().stats.report()
     
     # Update completion timestamp
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS update_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            update_type TEXT,
-            competitions_processed INTEGER,
-            teams_updated INTEGER,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    writer.flush()
+    sync_seasons(writer.conn)
+    moved = assign_main_competitions(writer.conn)
+    print(f"   Main competition changed: {moved} teams")
+    cursor = writer.conn.cursor()
     cursor.execute('''
-        INSERT INTO update_log (update_type, competitions_processed, teams_updated)
-        VALUES (?, ?, ?)
-    ''', ('current_season', successful_updates, total_updated))
-    conn.commit()
-    conn.close()
+        INSERT INTO update_log (update_type, competitions_processed, teams_updated, competitions_skipped)
+        VALUES (?, ?, ?, ?)
+    ''', ('current_season', successful_updates, total_updated, skipped_unchanged))
+    update_log_id = cursor.lastrowid
+    writer.close()
+    writer.report()
+    metrics.store(DB_PATH, update_log_id, get_client().stats, [writer], conn=conn)
     
     return True
 
 if __name__ == "__main__":
-    success = update_current_season()
+    with profile_run("update_current_season"):
+        success = update_current_season()
     if not success:
         exit(1)
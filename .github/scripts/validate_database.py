@@ -2,12 +2,15 @@
 """
 Database Validation Script
 Validates the updated database for consistency and completeness
+All counts come from the db_metrics snapshot for the latest update
 """
 
-import sqlite3
 import os
 from datetime import datetime
 
+from db_metrics import load_metrics, db_size_mb, CORE_TABLES
+from profiling import profile_run
+
 def resolve_db_path():
     workspace = os.getenv("GITHUB_WORKSPACE")
     if workspace:
@@ -16,8 +19,8 @@ def resolve_db_path():
 
 DB_PATH = resolve_db_path()
 
-def validate_database():
-    """Validate database integrity and completeness"""
+def validate_database(conn=None, metrics=None):
+    """Validate database integrity and completeness, from metrics when already loaded"""
     print(f"✅ VALIDATING DATABASE - {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print("="*60)
     
@@ -25,19 +28,17 @@ def validate_database():
         print("❌ Database file not found!")
         return False
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    if metrics is None:
+        metrics = load_metrics(DB_PATH, conn)
     
     validation_passed = True
     
     # Test 1: Check table existence
     print("🔍 Test 1: Table Structure")
-    expected_tables = ['countries', 'competitions', 'teams', 'team_competitions', 'sports', 'seasons']
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    existing_tables = [row[0] for row in cursor.fetchall()]
+    counts = metrics['tables']
     
-    for table in expected_tables:
-        if table in existing_tables:
+    for table in CORE_TABLES:
+        if table in counts:
             print(f"  ✅ {table} table exists")
         else:
             print(f"  ❌ {table} table missing!")
@@ -46,11 +47,8 @@ def validate_database():
     # Test 2: Check data counts
     print("\n📊 Test 2: Data Completeness")
     
-    counts = {}
-    for table in expected_tables:
-        if table in existing_tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            counts[table] = cursor.fetchone()[0]
+    for table in CORE_TABLES:
+        if table in counts:
             print(f"  📋 {table}: {counts[table]:,} records")
     
     # Test 3: Check for critical data
@@ -77,21 +75,17 @@ def validate_database():
     # Test 4: Check foreign key relationships
     print("\n🔗 Test 4: Relationship Integrity")
     
+    team_metrics = metrics.get('teams', {})
+    
     # Teams without countries
-    cursor.execute("SELECT COUNT(*) FROM teams WHERE country_id IS NULL")
-    teams_without_countries = cursor.fetchone()[0]
+    teams_without_countries = team_metrics.get('without_country', 0)
     if teams_without_countries > counts.get('teams', 0) * 0.1:  # More than 10% missing
         print(f"  ⚠️ {teams_without_countries} teams without countries ({teams_without_countries/counts.get('teams', 1)*100:.1f}%)")
     else:
         print(f"  ✅ Teams with countries: {counts.get('teams', 0) - teams_without_countries}/{counts.get('teams', 0)}")
     
     # Teams without competitions
-    cursor.execute("""
-        SELECT COUNT(*) FROM teams t 
-        LEFT JOIN team_competitions tc ON t.id = tc.team_id 
-        WHERE tc.team_id IS NULL
-    """)
-    teams_without_competitions = cursor.fetchone()[0]
+    teams_without_competitions = team_metrics.get('without_competitions', 0)
     if teams_without_competitions > 0:
         print(f"  ⚠️ {teams_without_competitions} teams without competitions")
     else:
@@ -101,13 +95,11 @@ def validate_database():
     print("\n⏰ Test 5: Update Recency")
     
     # Check if update_log exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='update_log'")
-    if cursor.fetchone():
-        cursor.execute("SELECT * FROM update_log ORDER BY timestamp DESC LIMIT 1")
-        latest_update = cursor.fetchone()
-        if latest_update:
-            print(f"  ✅ Latest update: {latest_update[4]} ({latest_update[1]})")
-            print(f"  📊 Competitions: {latest_update[2]}, Teams: {latest_update[3]}")
+    if 'recent_updates' in metrics:
+        if metrics['recent_updates']:
+            update_type, comps, teams, timestamp, skipped = metrics['recent_updates'][0]
+            print(f"  ✅ Latest update: {timestamp} ({update_type})")
+            print(f"  📊 Competitions: {comps}, Teams: {teams}, Unchanged: {skipped or 0}")
         else:
             print(f"  ⚠️ No update records found")
     else:
@@ -116,18 +108,16 @@ def validate_database():
     # Test 6: Check data quality
     print("\n🎯 Test 6: Data Quality")
     
+    comp_metrics = metrics.get('competitions', {})
+    
     # Competitions with popularity ranks
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE popularity_rank IS NOT NULL")
-    comps_with_popularity = cursor.fetchone()[0]
+    comps_with_popularity = comp_metrics.get('with_popularity', 0)
     print(f"  📈 Competitions with popularity: {comps_with_popularity}/{counts.get('competitions', 0)}")
     
     # Competitions with standings
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_standings = 1")
-    comps_with_standings = cursor.fetchone()[0]
+    comps_with_standings = comp_metrics.get('with_standings', 0)
     print(f"  📊 Competitions with standings: {comps_with_standings}/{counts.get('competitions', 0)}")
     
-    conn.close()
-    
     # Final result
     print(f"\n{'='*60}")
     if validation_passed:
@@ -139,61 +129,50 @@ def validate_database():
     
     return validation_passed
 
-def get_database_stats():
+def get_database_stats(conn=None, metrics=None):
     """Get detailed database statistics"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    if metrics is None:
+        metrics = load_metrics(DB_PATH, conn)
     
     stats = {}
     
     # Basic counts
-    tables = ['countries', 'competitions', 'teams', 'team_competitions', 'sports', 'seasons']
-    for table in tables:
-        try:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            stats[f"{table}_count"] = cursor.fetchone()[0]
-        except:
-            stats[f"{table}_count"] = 0
+    for table in CORE_TABLES:
+        stats[f"{table}_count"] = metrics['tables'].get(table, 0)
     
     # Active relationships
-    cursor.execute("SELECT COUNT(*) FROM team_competitions WHERE is_active = 1")
-    stats['active_team_competitions'] = cursor.fetchone()[0]
+    stats['active_team_competitions'] = metrics.get('team_competitions', {}).get('active', 0)
     
     # Competitions with features
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_standings = 1")
-    stats['competitions_with_standings'] = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM competitions WHERE has_stats = 1")  
-    stats['competitions_with_stats'] = cursor.fetchone()[0]
+    stats['competitions_with_standings'] = metrics.get('competitions', {}).get('with_standings', 0)
+    stats['competitions_with_stats'] = metrics.get('competitions', {}).get('with_stats', 0)
     
     # Top countries by team count
-    cursor.execute("""
-        SELECT c.name, COUNT(t.id) as team_count 
-        FROM countries c 
-        LEFT JOIN teams t ON c.id = t.country_id 
-        GROUP BY c.id, c.name 
-        ORDER BY team_count DESC 
-        LIMIT 10
-    """)
-    stats['top_countries'] = cursor.fetchall()
+    stats['top_countries'] = [tuple(row) for row in metrics.get('top_countries', [])]
     
     # Database file size
-    stats['db_size_mb'] = round(os.path.getsize(DB_PATH) / 1024 / 1024, 2)
+    stats['db_size_mb'] = db_size_mb(DB_PATH)
     
-    conn.close()
     return stats
 
-if __name__ == "__main__":
-    success = validate_database()
-    if not success:
-        exit(1)
+def main(conn=None, metrics=None):
+    """Validate and, if that passes, print the detailed statistics"""
+    if not validate_database(conn, metrics):
+        return False
     
     # Print detailed stats
     print(f"\n📊 DETAILED STATISTICS")
-    stats = get_database_stats()
+    stats = get_database_stats(conn, metrics)
     print(f"Database size: {stats['db_size_mb']} MB")
     print(f"Active team-competition relationships: {stats['active_team_competitions']:,}")
     
     print(f"\nTop 5 countries by team count:")
     for country, count in stats['top_countries'][:5]:
         print(f"  {country}: {count} teams")
+    return True
+
+if __name__ == "__main__":
+    with profile_run("validate_database"):
+        success = main()
+    if not success:
+        exit(1)